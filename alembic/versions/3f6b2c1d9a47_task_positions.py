@@ -0,0 +1,61 @@
+"""Task positions
+
+Revision ID: 3f6b2c1d9a47
+Revises: ea3c4aa2955a
+Create Date: 2026-10-19 10:12:41.503118
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3f6b2c1d9a47'
+down_revision = 'ea3c4aa2955a'
+branch_labels = None
+depends_on = None
+
+# copy of tasks.utils.rank_sequence as it was when this revision was written, migrations don't import app code.
+DIGITS = "0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz"
+BASE = len(DIGITS)
+
+
+def rank_sequence(count: int) -> list[str]:
+    width = 1
+    while BASE ** width <= count + 1:
+        width += 1
+    width += 1
+    step = BASE ** width // (count + 1)
+
+    ranks = []
+    for i in range(1, count + 1):
+        value = i * step
+        digits = ""
+        for _ in range(width):
+            value, digit = divmod(value, BASE)
+            digits = DIGITS[digit] + digits
+        ranks.append(digits.rstrip(DIGITS[0]))
+    return ranks
+
+
+def upgrade() -> None:
+    # ranks are compared byte by byte, locale collations ignore case of digits first and break their order.
+    op.add_column("task_list", sa.Column("position", sa.String(collation="C")))
+    op.create_index("ix_task_list_list_id_position", "task_list", ["list_id", "position"])
+
+    # existing tasks keep their insertion order.
+    conn = op.get_bind()
+    rows = conn.execute(sa.text("SELECT pk, list_id FROM task_list ORDER BY list_id, pk")).all()
+    lists: dict[int, list[int]] = {}
+    for pk, list_id in rows:
+        lists.setdefault(list_id, []).append(pk)
+    for pks in lists.values():
+        conn.execute(
+            sa.text("UPDATE task_list SET position = :position WHERE pk = :pk"),
+            [{"pk": pk, "position": position} for pk, position in zip(pks, rank_sequence(len(pks)))]
+        )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_task_list_list_id_position", "task_list")
+    op.drop_column("task_list", "position")
@@ -0,0 +1,40 @@
+"""Task archive
+
+Revision ID: 4e9d7a2b6c31
+Revises: c5a09e3f7d12
+Create Date: 2026-10-19 12:37:52.094615
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '4e9d7a2b6c31'
+down_revision = 'c5a09e3f7d12'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column("task", sa.Column("completed_at", sa.DateTime))
+    # tasks completed before this migration get the time of the migration, so they are archived later.
+    op.execute("UPDATE task SET completed_at = now() WHERE done IS true")
+    op.create_table(
+        "task_archive",
+        sa.Column("id", sa.Integer, primary_key=True),
+        sa.Column("task", sa.String),
+        sa.Column("time", sa.Time),
+        sa.Column("description", sa.Text),
+        sa.Column("list_id", sa.Integer),
+        sa.Column("user_id", sa.Integer),
+        sa.Column("completed_at", sa.DateTime),
+        sa.Column("archived_at", sa.DateTime)
+    )
+    op.create_index("ix_task_archive_user_id_completed_at", "task_archive", ["user_id", "completed_at"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_task_archive_user_id_completed_at", "task_archive")
+    op.drop_table("task_archive")
+    op.drop_column("task", "completed_at")
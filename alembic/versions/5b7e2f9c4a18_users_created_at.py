@@ -0,0 +1,32 @@
+"""Users created at
+
+Revision ID: 5b7e2f9c4a18
+Revises: 91f3a6d2c8e4
+Create Date: 2026-10-19 16:12:48.309174
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5b7e2f9c4a18'
+down_revision = '91f3a6d2c8e4'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # existing users get time of migration, so unverified ones are purged after the usual delay.
+    op.add_column("users", sa.Column("created_at", sa.DateTime, server_default=sa.func.now()))
+    op.create_index(
+        "ix_users_unverified_created_at",
+        "users",
+        ["created_at"],
+        postgresql_where=sa.text("disabled IS true")
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_users_unverified_created_at", "users")
+    op.drop_column("users", "created_at")
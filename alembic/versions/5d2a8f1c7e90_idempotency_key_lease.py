@@ -0,0 +1,25 @@
+"""Idempotency key lease
+
+Revision ID: 5d2a8f1c7e90
+Revises: b3e59d0c6f14
+Create Date: 2026-10-21 09:14:37.208461
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5d2a8f1c7e90'
+down_revision = 'b3e59d0c6f14'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # rows without it which are still processed are taken over by the next retry.
+    op.add_column("idempotency_key", sa.Column("locked_at", sa.DateTime))
+
+
+def downgrade() -> None:
+    op.drop_column("idempotency_key", "locked_at")
@@ -0,0 +1,59 @@
+"""Task owner
+
+Revision ID: 7a1c5f8e3b92
+Revises: 4e9d7a2b6c31
+Create Date: 2026-10-19 13:21:09.448170
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '7a1c5f8e3b92'
+down_revision = '4e9d7a2b6c31'
+branch_labels = None
+depends_on = None
+
+BATCH_SIZE = 10000
+
+
+def upgrade() -> None:
+    op.add_column("task", sa.Column("user_id", sa.Integer, sa.ForeignKey("users.id")))
+
+    # backfill by ranges of ids, each range is committed separately so the table isn't locked for the whole update.
+    conn = op.get_bind()
+    max_id = conn.execute(sa.text("SELECT max(id) FROM task")).scalar() or 0
+    with op.get_context().autocommit_block():
+        for start in range(0, max_id + 1, BATCH_SIZE):
+            conn.execute(
+                sa.text(
+                    """
+                    UPDATE task SET user_id = todolist.user_id
+                    FROM task_list JOIN todolist ON todolist.id = task_list.list_id
+                    WHERE task_list.task_id = task.id AND task.id >= :start AND task.id < :end
+                    """
+                ),
+                {"start": start, "end": start + BATCH_SIZE}
+            )
+
+    op.create_index("ix_task_user_id", "task", ["user_id"])
+    op.drop_index("ix_task_pending_time", "task")
+    op.create_index(
+        "ix_task_pending_time",
+        "task",
+        ["user_id", "time", "id"],
+        postgresql_where=sa.text("done IS false")
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_task_pending_time", "task")
+    op.create_index(
+        "ix_task_pending_time",
+        "task",
+        ["time", "id"],
+        postgresql_where=sa.text("done IS false")
+    )
+    op.drop_index("ix_task_user_id", "task")
+    op.drop_column("task", "user_id")
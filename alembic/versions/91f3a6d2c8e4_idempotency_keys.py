@@ -0,0 +1,34 @@
+"""Idempotency keys
+
+Revision ID: 91f3a6d2c8e4
+Revises: e2d84b0f61c5
+Create Date: 2026-10-19 14:40:16.735520
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '91f3a6d2c8e4'
+down_revision = 'e2d84b0f61c5'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "idempotency_key",
+        sa.Column("key", sa.String, primary_key=True),
+        sa.Column("fingerprint", sa.String),
+        sa.Column("status_code", sa.Integer),
+        sa.Column("content_type", sa.String),
+        sa.Column("body", sa.Text),
+        sa.Column("created_at", sa.DateTime)
+    )
+    op.create_index("ix_idempotency_key_created_at", "idempotency_key", ["created_at"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_idempotency_key_created_at", "idempotency_key")
+    op.drop_table("idempotency_key")
@@ -0,0 +1,47 @@
+"""Sync change log
+
+Revision ID: a4c81e6d3f57
+Revises: 5b7e2f9c4a18
+Create Date: 2026-10-19 17:25:03.671842
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a4c81e6d3f57'
+down_revision = '5b7e2f9c4a18'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "sync_revision",
+        sa.Column("user_id", sa.Integer, primary_key=True, autoincrement=False),
+        sa.Column("revision", sa.Integer, nullable=False, server_default="0"),
+        sa.Column("pruned_revision", sa.Integer, nullable=False, server_default="0")
+    )
+    # every existing user gets a row, so concurrent first changes of a user don't try to insert it twice.
+    op.execute("INSERT INTO sync_revision (user_id) SELECT id FROM users")
+
+    op.create_table(
+        "change_log",
+        sa.Column("id", sa.Integer, primary_key=True),
+        sa.Column("user_id", sa.Integer),
+        sa.Column("revision", sa.Integer),
+        sa.Column("entity", sa.String),
+        sa.Column("entity_id", sa.Integer),
+        sa.Column("deleted", sa.Boolean),
+        sa.Column("changed_at", sa.DateTime)
+    )
+    op.create_index("ix_change_log_user_id_revision", "change_log", ["user_id", "revision"])
+    op.create_index("ix_change_log_changed_at", "change_log", ["changed_at"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_change_log_changed_at", "change_log")
+    op.drop_index("ix_change_log_user_id_revision", "change_log")
+    op.drop_table("change_log")
+    op.drop_table("sync_revision")
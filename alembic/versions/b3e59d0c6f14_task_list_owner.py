@@ -0,0 +1,43 @@
+"""Task list owner
+
+Revision ID: b3e59d0c6f14
+Revises: e81f4c2a7b93
+Create Date: 2026-10-20 11:32:54.620917
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b3e59d0c6f14'
+down_revision = 'e81f4c2a7b93'
+branch_labels = None
+depends_on = None
+
+BATCH_SIZE = 10000
+
+
+def upgrade() -> None:
+    op.add_column("task_list", sa.Column("user_id", sa.Integer))
+
+    # backfill by ranges of ids, each range is committed separately so the table isn't locked for the whole update.
+    conn = op.get_bind()
+    max_pk = conn.execute(sa.text("SELECT max(pk) FROM task_list")).scalar() or 0
+    with op.get_context().autocommit_block():
+        for start in range(0, max_pk + 1, BATCH_SIZE):
+            conn.execute(
+                sa.text(
+                    """
+                    UPDATE task_list SET user_id = task.user_id
+                    FROM task
+                    WHERE task.id = task_list.task_id AND task_list.pk >= :start AND task_list.pk < :end
+                    """
+                ),
+                {"start": start, "end": start + BATCH_SIZE}
+            )
+
+
+def downgrade() -> None:
+    # partitioned task table has to be turned back into a plain one first, see db.partition_tasks.
+    op.drop_column("task_list", "user_id")
@@ -0,0 +1,31 @@
+"""Upcoming tasks indexes
+
+Revision ID: b81d4e7c25f0
+Revises: 3f6b2c1d9a47
+Create Date: 2026-10-19 11:03:27.218940
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b81d4e7c25f0'
+down_revision = '3f6b2c1d9a47'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_index(
+        "ix_task_pending_time",
+        "task",
+        ["time", "id"],
+        postgresql_where=sa.text("done IS false")
+    )
+    op.create_index("ix_todolist_user_id", "todolist", ["user_id"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_todolist_user_id", "todolist")
+    op.drop_index("ix_task_pending_time", "task")
@@ -0,0 +1,36 @@
+"""List counters
+
+Revision ID: c5a09e3f7d12
+Revises: b81d4e7c25f0
+Create Date: 2026-10-19 11:48:05.671392
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c5a09e3f7d12'
+down_revision = 'b81d4e7c25f0'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column("todolist", sa.Column("task_count", sa.Integer, nullable=False, server_default="0"))
+    op.add_column("todolist", sa.Column("done_count", sa.Integer, nullable=False, server_default="0"))
+    op.execute(
+        """
+        UPDATE todolist SET
+            task_count = (SELECT count(*) FROM task_list WHERE task_list.list_id = todolist.id),
+            done_count = (
+                SELECT count(*) FROM task_list JOIN task ON task.id = task_list.task_id
+                WHERE task_list.list_id = todolist.id AND task.done IS true
+            )
+        """
+    )
+
+
+def downgrade() -> None:
+    op.drop_column("todolist", "done_count")
+    op.drop_column("todolist", "task_count")
@@ -0,0 +1,29 @@
+"""Shard map
+
+Revision ID: c7d3b95e1a26
+Revises: a4c81e6d3f57
+Create Date: 2026-10-19 19:42:11.208315
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c7d3b95e1a26'
+down_revision = 'a4c81e6d3f57'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "shard_map",
+        sa.Column("user_id", sa.Integer, primary_key=True, autoincrement=False),
+        sa.Column("shard", sa.Integer, nullable=False),
+        sa.Column("moving", sa.Boolean, nullable=False, server_default=sa.false())
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("shard_map")
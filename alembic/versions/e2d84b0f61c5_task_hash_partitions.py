@@ -0,0 +1,25 @@
+"""Task hash partitions
+
+Does nothing: partitioning of task table is done by `python -m db.partition_tasks`, so the schema of this revision
+doesn't depend on environment. The revision is kept because later ones revise it.
+
+Revision ID: e2d84b0f61c5
+Revises: 7a1c5f8e3b92
+Create Date: 2026-10-19 13:54:38.102957
+
+"""
+
+
+# revision identifiers, used by Alembic.
+revision = 'e2d84b0f61c5'
+down_revision = '7a1c5f8e3b92'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    pass
+
+
+def downgrade() -> None:
+    pass
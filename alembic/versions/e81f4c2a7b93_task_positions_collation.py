@@ -0,0 +1,25 @@
+"""Task positions collation
+
+Revision ID: e81f4c2a7b93
+Revises: c7d3b95e1a26
+Create Date: 2026-10-20 10:05:37.118402
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e81f4c2a7b93'
+down_revision = 'c7d3b95e1a26'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # databases migrated before positions got C collation. Index on positions is rebuilt by postgres.
+    op.alter_column("task_list", "position", type_=sa.String(collation="C"), existing_type=sa.String)
+
+
+def downgrade() -> None:
+    op.alter_column("task_list", "position", type_=sa.String, existing_type=sa.String(collation="C"))
@@ -0,0 +1,29 @@
+"""Completed tasks index
+
+Revision ID: f4a7c2e9b318
+Revises: 5d2a8f1c7e90
+Create Date: 2026-10-21 10:02:51.447193
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f4a7c2e9b318'
+down_revision = '5d2a8f1c7e90'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_index(
+        "ix_task_done_completed_at",
+        "task",
+        ["completed_at"],
+        postgresql_where=sa.text("done IS true")
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_task_done_completed_at", "task")
@@ -0,0 +1,25 @@
+from typing import Any
+
+from pydantic import BaseModel
+
+
+class Operation(BaseModel):
+    method: str
+    path: str # path of an endpoint without /api/v1 prefix, e.g. /tasks/1/complete.
+    query: dict[str, str] = {}
+    body: Any = None
+
+
+class Batch(BaseModel):
+    operations: list[Operation]
+    atomic: bool = False # all operations are committed together or not committed at all.
+
+
+class OperationResult(BaseModel):
+    status_code: int
+    body: Any = None
+
+
+class BatchResult(BaseModel):
+    rolled_back: bool # True if atomic batch has failed and none of its operations were committed.
+    results: list[OperationResult]
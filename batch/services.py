@@ -0,0 +1,150 @@
+import logging
+import os
+from urllib.parse import urlencode
+
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Request, status
+from fastapi.dependencies.utils import solve_dependencies
+from fastapi.encoders import jsonable_encoder
+from fastapi.exceptions import RequestValidationError
+from fastapi.routing import APIRoute, run_endpoint_function, serialize_response
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.routing import Match
+
+from db.database import get_session, session_commit
+from users.models import Session
+from users.services import oauth2_scheme
+from users.utils.get_current_user import is_user_activated
+from users.utils.get_user_session import get_user_session
+
+from .models import Batch, BatchResult, Operation, OperationResult
+
+logger = logging.getLogger(__name__)
+
+batch_router = APIRouter()
+
+BATCH_MAX_OPERATIONS = int(os.environ.get("BATCH_MAX_OPERATIONS", 50))
+BATCH_PATHS = ("/lists", "/tasks") # only endpoints of lists and tasks can be called in a batch.
+
+@batch_router.post("", response_model=BatchResult, status_code=status.HTTP_200_OK)
+async def run_batch(
+    request: Request,
+    batch: Batch,
+    backgroundtasks: BackgroundTasks,
+    token: str = Depends(oauth2_scheme),
+    session: AsyncSession = Depends(get_session),
+    user_session: AsyncSession = Depends(get_user_session),
+):
+    """
+    Function to run several operations with lists and tasks in one request.
+    User is authenticated once and all operations use one session with database.
+    Args:
+        request: current request, its headers are passed to operations.
+        batch: form with ordered operations and flag whether they have to be committed together.
+        backgroundtasks: instance of BackgroundTasks class which collects background tasks of operations.
+        token: token of currently logged in user.
+        session: instance of current session with the main database.
+        user_session: instance of session with a database which keeps lists and tasks of the user.
+    Returns:
+        JSON with status code and body of every executed operation.
+    """
+    if len(batch.operations) > BATCH_MAX_OPERATIONS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Batch can't contain more than {BATCH_MAX_OPERATIONS} operations."
+        )
+
+    # user is remembered by the session, so operations don't query it again.
+    await is_user_activated(token=token, session=Session(session=session))
+    # session_commit only flushes operations of atomic batch, they are committed below.
+    user_session.info["defer_commit"] = batch.atomic
+
+    results = []
+    for operation in batch.operations:
+        result = await run_operation(request, operation, session, user_session, backgroundtasks)
+        results.append(result)
+        if result.status_code >= 400:
+            await user_session.rollback() # changes of failed operation aren't committed.
+            if batch.atomic:
+                return BatchResult(rolled_back=True, results=results)
+
+    if batch.atomic:
+        user_session.info["defer_commit"] = False
+        await session_commit(
+            Exception,
+            HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Something went wrong.",
+                headers={"WWW-Authenticate": "Bearer"}
+            ),
+            user_session
+        )
+    return BatchResult(rolled_back=False, results=results)
+
+async def run_operation(
+    request: Request,
+    operation: Operation,
+    session: AsyncSession,
+    user_session: AsyncSession,
+    backgroundtasks: BackgroundTasks
+) -> OperationResult:
+    """
+    Function to call an endpoint as it would be called by a separate request, but with given sessions.
+    Args:
+        request: batch request.
+        operation: method, path, query parameters and body of the operation.
+        session: instance of current session with the main database.
+        user_session: instance of session with a database which keeps lists and tasks of the user.
+        backgroundtasks: instance of BackgroundTasks class of batch request.
+    Returns:
+        Status code and body of endpoint's response.
+    """
+    if not operation.path.startswith(BATCH_PATHS):
+        return OperationResult(status_code=status.HTTP_404_NOT_FOUND, body={"detail": "Not Found"})
+
+    # path of batch endpoint without /batch is the prefix of all API endpoints.
+    path = request.scope["path"].rsplit("/batch", 1)[0] + operation.path
+    scope = {
+        **request.scope,
+        "method": operation.method.upper(),
+        "path": path,
+        "raw_path": path.encode(),
+        "query_string": urlencode(operation.query).encode(),
+    }
+    route = None
+    for candidate in request.app.router.routes:
+        if isinstance(candidate, APIRoute):
+            match, child_scope = candidate.matches(scope)
+            if match == Match.FULL:
+                route = candidate
+                scope.update(child_scope)
+                break
+    if route is None:
+        return OperationResult(status_code=status.HTTP_404_NOT_FOUND, body={"detail": "Not Found"})
+
+    try:
+        values, errors, _, _, _ = await solve_dependencies(
+            request=Request(scope),
+            dependant=route.dependant,
+            body=operation.body,
+            background_tasks=backgroundtasks,
+            dependency_overrides_provider=request.app,
+            # every operation gets the sessions of the batch.
+            dependency_cache={(get_session, ()): session, (get_user_session, ()): user_session}
+        )
+        if errors:
+            raise RequestValidationError(errors)
+
+        raw_response = await run_endpoint_function(dependant=route.dependant, values=values, is_coroutine=True)
+        body = await serialize_response(
+            field=route.response_field,
+            response_content=raw_response,
+            exclude_unset=route.response_model_exclude_unset
+        )
+        return OperationResult(status_code=route.status_code or status.HTTP_200_OK, body=jsonable_encoder(body))
+    except HTTPException as e:
+        return OperationResult(status_code=e.status_code, body={"detail": e.detail})
+    except RequestValidationError as e:
+        return OperationResult(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, body={"detail": jsonable_encoder(e.errors())})
+    except Exception:
+        logger.exception("Operation %s %s of a batch failed.", operation.method, operation.path)
+        return OperationResult(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, body={"detail": "Internal Server Error"})
@@ -0,0 +1,51 @@
+"""
+Benchmark of CPU time and saved bytes of response compression on payloads like GET /api/v1/lists returns.
+Run from the repository root: python -m benchmarks.compression
+"""
+import datetime as dt
+import json
+import timeit
+
+from db import schemas
+from middlewares.compression import COMPRESSORS
+
+# (lists, tasks in every list): a new user, a typical user and a heavy user.
+PAYLOAD_SIZES = [(3, 5), (10, 20), (50, 40)]
+DESCRIPTION = "Buy milk, bread and eggs on the way home, check whether the shop near the office is open on Sunday. "
+
+def make_payload(lists: int, tasks: int) -> bytes:
+    data = [
+        schemas.List(
+            id=list_id,
+            name=f"List number {list_id}",
+            user_id=1,
+            task_count=tasks,
+            done_count=tasks // 3,
+            tasks=[
+                schemas.Task(
+                    id=list_id * tasks + task_id,
+                    task=f"Task number {task_id}",
+                    time=dt.time(hour=task_id % 24, minute=30),
+                    description=DESCRIPTION * (task_id % 4),
+                    done=task_id % 3 == 0
+                ) for task_id in range(tasks)
+            ]
+        ).dict() for list_id in range(lists)
+    ]
+    return json.dumps(data, default=str).encode()
+
+def main() -> None:
+    print(f"{'payload':>16} {'encoding':>8} {'size':>9} {'ratio':>6} {'time, ms':>9} {'MB/s':>7}")
+    for lists, tasks in PAYLOAD_SIZES:
+        payload = make_payload(lists, tasks)
+        for encoding, compressor in COMPRESSORS.items():
+            compressed = compressor().finish(payload)
+            runs = 50
+            seconds = timeit.timeit(lambda: compressor().finish(payload), number=runs) / runs
+            print(
+                f"{f'{lists}x{tasks} {len(payload) // 1024}KB':>16} {encoding:>8} {len(compressed):>9} "
+                f"{len(payload) / len(compressed):>6.1f} {seconds * 1000:>9.3f} {len(payload) / seconds / 2 ** 20:>7.0f}"
+            )
+
+if __name__ == "__main__":
+    main()
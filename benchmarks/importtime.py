@@ -0,0 +1,68 @@
+"""
+Benchmark of import time of the app, which every worker, alembic run and tool pays on start.
+Imports a module in fresh interpreters with `python -X importtime` and prints median total time
+and packages which take the most of it.
+For main it fails when the time exceeds MAIN_LIMIT_MS or packages which are loaded on first use get imported.
+Reference: import main took 1048 ms (median of 5 runs, 850 modules) with Python 3.11 on a single core,
+sqlalchemy 256 ms and fastapi 81 ms of it.
+Run from the repository root: python -m benchmarks.importtime [module, main by default]
+"""
+from collections import defaultdict
+import statistics
+import subprocess
+import sys
+
+RUNS = 5
+TOP_PACKAGES = 15
+# the reference with room for noise of a busy machine.
+MAIN_LIMIT_MS = 1500
+# mail client and database driver are created on first use, see users.utils.mail and db.database.
+LAZY_PACKAGES = ["fastapi_mail", "asyncpg"]
+
+def import_times(module: str) -> dict[str, tuple[int, int]]:
+    # every line of -X importtime output is "import time: self | cumulative | indented name" in microseconds.
+    process = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True,
+        text=True,
+        check=True
+    )
+    times = {}
+    for line in process.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_time, cumulative, name = line.removeprefix("import time:").split("|")
+        times[name.strip()] = int(self_time), int(cumulative)
+    return times
+
+def main() -> None:
+    module = sys.argv[1] if len(sys.argv) > 1 else "main"
+    runs = [import_times(module) for _ in range(RUNS)]
+
+    total = statistics.median(times[module][1] for times in runs)
+    print(f"import {module}: {total / 1000:.1f} ms (median of {RUNS} runs), {len(runs[0])} modules")
+
+    # self time of every module is added to its top-level package, e.g. sqlalchemy.orm.query to sqlalchemy.
+    packages = defaultdict(list)
+    for times in runs:
+        package_times = defaultdict(int)
+        for name, (self_time, _) in times.items():
+            package_times[name.split(".")[0]] += self_time
+        for package, self_time in package_times.items():
+            packages[package].append(self_time)
+    medians = sorted(((statistics.median(values), package) for package, values in packages.items()), reverse=True)
+    print(f"{'package':>24} {'ms':>7}")
+    for self_time, package in medians[:TOP_PACKAGES]:
+        print(f"{package:>24} {self_time / 1000:>7.1f}")
+
+    if module != "main":
+        return
+    errors = [f"{package} is imported." for package in LAZY_PACKAGES if package in packages]
+    if total / 1000 > MAIN_LIMIT_MS:
+        errors.append(f"import main takes more than {MAIN_LIMIT_MS} ms.")
+    if errors:
+        print("\n".join(errors))
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+"""
+Benchmark of time spent on queries of frequent requests: building statements in every request compared with
+statements prebuilt in db.queries. Queries are executed on in-memory SQLite, compilation is measured for PostgreSQL.
+Run from the repository root: python -m benchmarks.queries
+"""
+import datetime as dt
+import timeit
+
+import sqlalchemy
+from sqlalchemy.dialects.postgresql import asyncpg
+
+from db import models, queries
+from todolists.utils import LIST_COLUMNS, TASK_FIELDS
+
+LISTS = 10
+TASKS = 20 # in every list.
+USER = {"email": "user@example.com", "user_id": 1}
+RUNS = 2000
+
+# every query of a route is (function building it like a handler did, prebuilt statement, its parameters).
+def build_routes() -> dict[str, list[tuple]]:
+    list_ids = list(range(1, LISTS + 1))
+    task_columns = [models.task.c[field] for field in TASK_FIELDS]
+    counters = {"list_id": 1, "task_delta": 0, "done_delta": 0}
+
+    def tasks_of_lists(ids: list[int]) -> sqlalchemy.sql.Select:
+        return sqlalchemy.select(models.task_list.c.list_id, *task_columns).join(
+            models.task, models.task.c.id == models.task_list.c.task_id
+        ).where(
+            models.task_list.c.list_id.in_(ids),
+            models.task.c.user_id == USER["user_id"]
+        ).order_by(models.task_list.c.list_id, models.task_list.c.position, models.task_list.c.pk)
+
+    def update_counters() -> sqlalchemy.sql.Update:
+        return models.todolist.update().where(models.todolist.c.id == 1).values(
+            task_count=models.todolist.c.task_count + 0,
+            done_count=models.todolist.c.done_count + 0
+        )
+
+    principal = (
+        lambda: models.users.select(models.users.c.email == USER["email"]),
+        queries.principal_by_email,
+        {"email": USER["email"]}
+    )
+    return {
+        "any authenticated": [principal],
+        "GET /lists": [
+            principal,
+            (
+                lambda: sqlalchemy.select(*[models.todolist.c[field] for field in LIST_COLUMNS]).where(
+                    models.todolist.c.user_id == USER["user_id"]
+                ),
+                queries.lists_by_user(LIST_COLUMNS),
+                {"user_id": USER["user_id"]}
+            ),
+            (lambda: tasks_of_lists(list_ids), queries.tasks_of_lists(TASK_FIELDS), {"list_ids": list_ids, **USER}),
+        ],
+        "GET /lists/{id}": [
+            principal,
+            (
+                lambda: sqlalchemy.select(*[models.todolist.c[field] for field in LIST_COLUMNS]).where(
+                    models.todolist.c.id == 1
+                ),
+                queries.list_by_id(LIST_COLUMNS),
+                {"list_id": 1}
+            ),
+            (lambda: tasks_of_lists([1]), queries.tasks_of_lists(TASK_FIELDS), {"list_ids": [1], **USER}),
+        ],
+        "POST /tasks/{id}/create": [
+            principal,
+            (
+                lambda: sqlalchemy.select(sqlalchemy.func.max(models.task_list.c.position)).where(
+                    models.task_list.c.list_id == 1
+                ),
+                queries.last_position,
+                {"list_id": 1}
+            ),
+            (update_counters, queries.update_counters, counters),
+        ],
+        "PATCH /tasks/{id}/complete": [
+            principal,
+            (
+                lambda: sqlalchemy.select(models.task_list.c.list_id).where(models.task_list.c.task_id == 1),
+                queries.list_id_by_task,
+                {"task_id": 1}
+            ),
+            (update_counters, queries.update_counters, counters),
+            (
+                lambda: models.task.select().where((models.task.c.id == 1) & (models.task.c.user_id == USER["user_id"])),
+                queries.task_by_owner,
+                {"task_id": 1, **USER}
+            ),
+        ],
+    }
+
+def create_engine(query_cache_size: int) -> sqlalchemy.engine.Engine:
+    engine = sqlalchemy.create_engine("sqlite://", future=True, query_cache_size=query_cache_size)
+    models.metadata.create_all(engine)
+    with engine.begin() as conn:
+        conn.execute(models.users.insert().values(id=USER["user_id"], email=USER["email"], disabled=False))
+        conn.execute(models.todolist.insert(), [
+            {"id": list_id, "name": f"List {list_id}", "user_id": USER["user_id"]} for list_id in range(1, LISTS + 1)
+        ])
+        conn.execute(models.task.insert(), [
+            {"id": task_id, "task": f"Task {task_id}", "time": dt.time(task_id % 24), "done": False, "user_id": USER["user_id"]}
+            for task_id in range(1, LISTS * TASKS + 1)
+        ])
+        conn.execute(models.task_list.insert(), [
+            {"list_id": (task_id - 1) // TASKS + 1, "task_id": task_id, "user_id": USER["user_id"], "position": str(task_id).zfill(4)}
+            for task_id in range(1, LISTS * TASKS + 1)
+        ])
+    return engine
+
+def execute(conn: sqlalchemy.engine.Connection, statement: sqlalchemy.sql.Executable, params: dict | None = None) -> None:
+    result = conn.execute(statement, params)
+    if result.returns_rows:
+        result.all()
+
+def measure(function) -> float:
+    return timeit.timeit(function, number=RUNS) / RUNS * 10 ** 6
+
+def main() -> None:
+    dialect = asyncpg.dialect()
+    cached_engine, uncached_engine = create_engine(1000), create_engine(0)
+    print(f"{'route':>26} {'build':>7} {'compile':>8} {'uncached':>9} {'inline':>7} {'prebuilt':>9}  (us per request)")
+    with cached_engine.connect() as cached_conn, uncached_engine.connect() as uncached_conn:
+        for route, statements in build_routes().items():
+            build = measure(lambda: [builder() for builder, _, _ in statements])
+            compile_ = measure(lambda: [builder().compile(dialect=dialect) for builder, _, _ in statements])
+            uncached = measure(lambda: [execute(uncached_conn, builder()) for builder, _, _ in statements])
+            inline = measure(lambda: [execute(cached_conn, builder()) for builder, _, _ in statements])
+            prebuilt = measure(lambda: [execute(cached_conn, statement, params) for _, statement, params in statements])
+            print(f"{route:>26} {build:>7.1f} {compile_:>8.1f} {uncached:>9.1f} {inline:>7.1f} {prebuilt:>9.1f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,310 @@
+import asyncio
+from collections import OrderedDict
+import itertools
+import json
+import time
+from typing import Any, Awaitable, Callable
+from urllib.parse import urlparse
+import uuid
+
+
+class CacheBackend:
+    """
+    Base class of cache backends. Values have to be JSON serializable.
+    Every value can be marked with tags, invalidation of a tag deletes all values marked with it and changes
+    version of the tag, so a value computed from data read before the invalidation isn't kept.
+    """
+    def __init__(self) -> None:
+        self.locks: dict[str, asyncio.Lock] = {}
+
+    async def get(self, key: str) -> Any | None:
+        raise NotImplementedError
+
+    async def set(self, key: str, value: Any, ttl: int, tags: list[str] = []) -> None:
+        raise NotImplementedError
+
+    async def delete(self, key: str) -> None:
+        raise NotImplementedError
+
+    async def invalidate(self, tags: list[str]) -> None:
+        raise NotImplementedError
+
+    async def tag_versions(self, tags: list[str]) -> list[Any]:
+        raise NotImplementedError
+
+    async def get_or_set(self, key: str, factory: Callable[[], Awaitable[Any]], ttl: int, tags: list[str] = []) -> Any:
+        """
+        Function to get a value or compute and store it if it's missing.
+        Concurrent misses of one key in one process wait for a single computation instead of running it several times.
+        Args:
+            key: key of a value.
+            factory: coroutine function which computes a value.
+            ttl: seconds during which a stored value is valid.
+            tags: tags of a value.
+        Returns:
+            Stored or computed value.
+        """
+        value = await self.get(key)
+        if value is not None:
+            return value
+
+        lock = self.locks.setdefault(key, asyncio.Lock())
+        try:
+            async with lock:
+                value = await self.get(key)
+                if value is None:
+                    value = await self._compute(key, factory, ttl, tags)
+        finally:
+            if not lock.locked() and self.locks.get(key) is lock:
+                del self.locks[key]
+        return value
+
+    async def _compute(self, key: str, factory: Callable[[], Awaitable[Any]], ttl: int, tags: list[str]) -> Any:
+        versions = await self.tag_versions(tags)
+        value = await factory()
+        await self.set(key, value, ttl, tags)
+        # the value may be read before a change whose tags were invalidated while it was computed, so it's dropped.
+        # Invalidation after this check deletes the value itself, because the value is marked with its tags already.
+        if await self.tag_versions(tags) != versions:
+            await self.delete(key)
+        return value
+
+    async def close(self) -> None:
+        pass
+
+
+class MemoryBackend(CacheBackend):
+    """
+    Cache in memory of a process with least recently used values eviction.
+    Args:
+        max_entries: maximum amount of stored values.
+    """
+    def __init__(self, max_entries: int) -> None:
+        super().__init__()
+        self.max_entries = max_entries
+        self.entries: OrderedDict[str, tuple[float, str, list[str]]] = OrderedDict()
+        self.tags: dict[str, set[str]] = {}
+        # versions are needed only by running computations, so they are kept only while there are some.
+        self.versions: dict[str, int] = {}
+        self.counter = itertools.count()
+        self.computing = 0
+
+    async def get(self, key: str) -> Any | None:
+        entry = self.entries.get(key)
+        if entry is None:
+            return None
+        expires_at, value, _ = entry
+        if expires_at < time.monotonic():
+            self._delete(key)
+            return None
+        self.entries.move_to_end(key)
+        # values are stored serialized, so callers can't change cached ones.
+        return json.loads(value)
+
+    async def set(self, key: str, value: Any, ttl: int, tags: list[str] = []) -> None:
+        self._delete(key)
+        self.entries[key] = (time.monotonic() + ttl, json.dumps(value), tags)
+        for tag in tags:
+            self.tags.setdefault(tag, set()).add(key)
+        while len(self.entries) > self.max_entries:
+            self._delete(next(iter(self.entries)))
+
+    async def delete(self, key: str) -> None:
+        self._delete(key)
+
+    async def invalidate(self, tags: list[str]) -> None:
+        if not self.computing:
+            self.versions.clear()
+        for tag in tags:
+            if self.computing:
+                self.versions[tag] = next(self.counter)
+            for key in self.tags.pop(tag, set()):
+                self._delete(key)
+
+    async def tag_versions(self, tags: list[str]) -> list[Any]:
+        return [self.versions.get(tag) for tag in tags]
+
+    async def _compute(self, key: str, factory: Callable[[], Awaitable[Any]], ttl: int, tags: list[str]) -> Any:
+        self.computing += 1
+        try:
+            return await super()._compute(key, factory, ttl, tags)
+        finally:
+            self.computing -= 1
+
+    def _delete(self, key: str) -> None:
+        entry = self.entries.pop(key, None)
+        if entry is None:
+            return
+        for tag in entry[2]:
+            keys = self.tags.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self.tags[tag]
+
+
+class RedisError(Exception):
+    pass
+
+
+# deletes a lock only if it's still held by the caller, in one step, so a lock taken meanwhile isn't deleted.
+RELEASE_LOCK_SCRIPT = """
+if redis.call("GET", KEYS[1]) == ARGV[1] then
+    return redis.call("DEL", KEYS[1])
+end
+return 0
+"""
+
+
+class RedisConnection:
+    """
+    Connection to a server which speaks Redis protocol (RESP2).
+    """
+    def __init__(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        self.reader = reader
+        self.writer = writer
+
+    async def execute(self, *args: str | bytes | int) -> Any:
+        command = [f"*{len(args)}\r\n".encode()]
+        for arg in args:
+            if not isinstance(arg, bytes):
+                arg = str(arg).encode()
+            command.append(b"$%d\r\n%s\r\n" % (len(arg), arg))
+        self.writer.write(b"".join(command))
+        await self.writer.drain()
+        return await self._read_reply()
+
+    async def _read_reply(self) -> Any:
+        line = await self.reader.readline()
+        if not line:
+            raise ConnectionError("Connection to cache server is closed.")
+        kind, payload = line[:1], line[1:-2]
+        if kind == b"+":
+            return payload.decode()
+        if kind == b"-":
+            raise RedisError(payload.decode())
+        if kind == b":":
+            return int(payload)
+        if kind == b"$":
+            length = int(payload)
+            if length == -1:
+                return None
+            data = await self.reader.readexactly(length + 2)
+            return data[:-2]
+        if kind == b"*":
+            length = int(payload)
+            if length == -1:
+                return None
+            return [await self._read_reply() for _ in range(length)]
+        raise RedisError(f"Unknown reply {line!r}.")
+
+    def close(self) -> None:
+        self.writer.close()
+
+
+class RedisBackend(CacheBackend):
+    """
+    Cache shared by all workers in a server which speaks Redis protocol.
+    Tags are stored as sets of keys. Besides the lock in a process, computation of a missing value is guarded
+    by a short lock in the server, so workers don't compute the same value at the same time.
+    Args:
+        url: redis://[:password@]host[:port][/db] address of the server.
+        pool_size: maximum amount of open connections.
+        prefix: prefix of all keys in the server.
+        lock_timeout: seconds after which the lock of computation expires.
+        version_ttl: seconds during which a version of an invalidated tag is kept, longer than any computation.
+    """
+    def __init__(
+        self,
+        url: str,
+        pool_size: int,
+        prefix: str = "todo:",
+        lock_timeout: float = 5,
+        version_ttl: int = 3600
+    ) -> None:
+        super().__init__()
+        parsed = urlparse(url)
+        self.host = parsed.hostname or "localhost"
+        self.port = parsed.port or 6379
+        self.password = parsed.password
+        self.db = int(parsed.path.lstrip("/") or 0)
+        self.prefix = prefix
+        self.lock_timeout = lock_timeout
+        self.version_ttl = version_ttl
+        self.pool: asyncio.Queue[RedisConnection | None] = asyncio.Queue()
+        for _ in range(pool_size):
+            self.pool.put_nowait(None) # connections are opened on first use.
+
+    async def execute(self, *args: str | bytes | int) -> Any:
+        connection = await self.pool.get()
+        try:
+            if connection is None:
+                connection = await self._connect()
+            return await connection.execute(*args)
+        except (ConnectionError, asyncio.IncompleteReadError, OSError):
+            if connection is not None:
+                connection.close()
+            connection = None
+            raise
+        finally:
+            self.pool.put_nowait(connection)
+
+    async def _connect(self) -> RedisConnection:
+        connection = RedisConnection(*await asyncio.open_connection(self.host, self.port))
+        if self.password:
+            await connection.execute("AUTH", self.password)
+        if self.db:
+            await connection.execute("SELECT", self.db)
+        return connection
+
+    async def get(self, key: str) -> Any | None:
+        value = await self.execute("GET", self.prefix + key)
+        return None if value is None else json.loads(value)
+
+    async def set(self, key: str, value: Any, ttl: int, tags: list[str] = []) -> None:
+        await self.execute("SET", self.prefix + key, json.dumps(value), "EX", ttl)
+        for tag in tags:
+            tag_key = f"{self.prefix}tag:{tag}"
+            await self.execute("SADD", tag_key, self.prefix + key)
+            # a tag lives at least as long as its values.
+            await self.execute("EXPIRE", tag_key, ttl)
+
+    async def delete(self, key: str) -> None:
+        await self.execute("DEL", self.prefix + key)
+
+    async def invalidate(self, tags: list[str]) -> None:
+        for tag in tags:
+            # random versions can't repeat after an expired one, as counters would.
+            await self.execute("SET", f"{self.prefix}version:{tag}", uuid.uuid4().hex, "EX", self.version_ttl)
+            tag_key = f"{self.prefix}tag:{tag}"
+            keys = await self.execute("SMEMBERS", tag_key)
+            await self.execute("DEL", tag_key, *keys)
+
+    async def tag_versions(self, tags: list[str]) -> list[Any]:
+        if not tags:
+            return []
+        return await self.execute("MGET", *[f"{self.prefix}version:{tag}" for tag in tags])
+
+    async def _compute(self, key: str, factory: Callable[[], Awaitable[Any]], ttl: int, tags: list[str]) -> Any:
+        lock_key = f"{self.prefix}lock:{key}"
+        # the lock expires while a slow computation runs and other worker may take it, so it's released by its token.
+        lock_token = uuid.uuid4().hex
+        deadline = time.monotonic() + self.lock_timeout
+        while not await self.execute("SET", lock_key, lock_token, "NX", "PX", int(self.lock_timeout * 1000)):
+            # other worker computes the value, it's waited for until the lock expires.
+            await asyncio.sleep(0.05)
+            value = await self.get(key)
+            if value is not None:
+                return value
+            if time.monotonic() > deadline:
+                return await super()._compute(key, factory, ttl, tags)
+        try:
+            return await super()._compute(key, factory, ttl, tags)
+        finally:
+            await self.execute("EVAL", RELEASE_LOCK_SCRIPT, 1, lock_key, lock_token)
+
+    async def close(self) -> None:
+        while not self.pool.empty():
+            connection = self.pool.get_nowait()
+            if connection is not None:
+                connection.close()
@@ -0,0 +1,178 @@
+"""
+Fake server which speaks Redis protocol (RESP2) with the commands used by RedisBackend, kept in memory of the process.
+Lets RedisBackend to be checked without Redis: `python -m cache.fakeserver` runs the checks below against it.
+EVAL understands only RELEASE_LOCK_SCRIPT of RedisBackend.
+"""
+import asyncio
+import time
+from typing import Any
+
+from .backends import RELEASE_LOCK_SCRIPT, RedisBackend
+
+
+class FakeRedisServer:
+    """
+    In-memory server, start() returns it listening on a random free port of localhost.
+    """
+    def __init__(self) -> None:
+        self.values: dict[bytes, bytes] = {}
+        self.sets: dict[bytes, set[bytes]] = {}
+        self.expires_at: dict[bytes, float] = {}
+        self.commands: list[str] = [] # names of executed commands, to check how many round trips were made.
+        self.server: asyncio.AbstractServer | None = None
+        self.connections: set[asyncio.Task] = set()
+        self.port = 0
+
+    async def start(self) -> "FakeRedisServer":
+        self.server = await asyncio.start_server(self._handle, "127.0.0.1", 0)
+        self.port = self.server.sockets[0].getsockname()[1]
+        return self
+
+    async def close(self) -> None:
+        if self.server is not None:
+            self.server.close()
+            for connection in self.connections:
+                connection.cancel()
+            await asyncio.gather(*self.connections, return_exceptions=True)
+            await self.server.wait_closed()
+
+    @property
+    def url(self) -> str:
+        return f"redis://127.0.0.1:{self.port}/0"
+
+    def _alive(self, key: bytes) -> bool:
+        if self.expires_at.get(key, float("inf")) < time.monotonic():
+            self._delete(key)
+        return key in self.values or key in self.sets
+
+    def _delete(self, key: bytes) -> int:
+        self.expires_at.pop(key, None)
+        return int(self.values.pop(key, None) is not None or self.sets.pop(key, None) is not None)
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        connection = asyncio.current_task()
+        self.connections.add(connection)
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                args = []
+                for _ in range(int(line[1:-2])):
+                    length = int((await reader.readline())[1:-2])
+                    args.append((await reader.readexactly(length + 2))[:-2])
+                writer.write(self._encode(self._execute(args)))
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError, asyncio.CancelledError):
+            pass
+        finally:
+            writer.close()
+            self.connections.discard(connection)
+
+    def _execute(self, args: list[bytes]) -> Any:
+        command, *args = args
+        command = command.decode().upper()
+        self.commands.append(command)
+        if command in ("AUTH", "SELECT"):
+            return "OK"
+        if command == "GET":
+            return self.values.get(args[0]) if self._alive(args[0]) else None
+        if command == "MGET":
+            return [self.values.get(key) if self._alive(key) else None for key in args]
+        if command == "SET":
+            key, value, options = args[0], args[1], [option.decode().upper() for option in args[2:]]
+            if "NX" in options and self._alive(key):
+                return None
+            self._delete(key)
+            self.values[key] = value
+            for option, unit in (("EX", 1), ("PX", 1000)):
+                if option in options:
+                    self.expires_at[key] = time.monotonic() + int(options[options.index(option) + 1]) / unit
+            return "OK"
+        if command == "SADD":
+            if not self._alive(args[0]):
+                self.sets[args[0]] = set()
+            self.sets[args[0]].update(args[1:])
+            return len(args) - 1
+        if command == "SMEMBERS":
+            return sorted(self.sets.get(args[0], ())) if self._alive(args[0]) else []
+        if command == "EXPIRE":
+            if not self._alive(args[0]):
+                return 0
+            self.expires_at[args[0]] = time.monotonic() + int(args[1])
+            return 1
+        if command == "DEL":
+            return sum(self._delete(key) for key in args if self._alive(key))
+        if command == "EVAL" and args[0].decode() == RELEASE_LOCK_SCRIPT:
+            key, token = args[2], args[3]
+            return self._delete(key) if self._alive(key) and self.values.get(key) == token else 0
+        return RuntimeError(f"Command {command} isn't supported.")
+
+    def _encode(self, value: Any) -> bytes:
+        if value is None:
+            return b"$-1\r\n"
+        if isinstance(value, Exception):
+            return f"-ERR {value}\r\n".encode()
+        if isinstance(value, int):
+            return b":%d\r\n" % value
+        if isinstance(value, str):
+            return f"+{value}\r\n".encode()
+        if isinstance(value, list):
+            return b"*%d\r\n" % len(value) + b"".join(self._encode(item) for item in value)
+        return b"$%d\r\n%s\r\n" % (len(value), value)
+
+
+async def check() -> None:
+    server = await FakeRedisServer().start()
+    backend = RedisBackend(server.url, pool_size=5, lock_timeout=0.2)
+    other_backend = RedisBackend(server.url, pool_size=5, lock_timeout=0.2) # the second worker.
+    try:
+        calls = []
+
+        async def factory() -> dict:
+            calls.append(1)
+            await asyncio.sleep(0.05)
+            return {"value": len(calls)}
+
+        # concurrent misses in one worker and in two workers compute a value once.
+        values = await asyncio.gather(*[backend.get_or_set("a", factory, 10, ["tag"]) for _ in range(10)])
+        assert values == [{"value": 1}] * 10 and len(calls) == 1, values
+        values = await asyncio.gather(backend.get_or_set("b", factory, 10), other_backend.get_or_set("b", factory, 10))
+        assert values == [{"value": 2}] * 2 and len(calls) == 2, values
+
+        # invalidation of a tag deletes its values.
+        await backend.invalidate(["tag"])
+        assert await other_backend.get("a") is None
+
+        # a value computed while its tag was invalidated isn't kept.
+        computing = asyncio.Event()
+
+        async def slow_factory() -> dict:
+            computing.set()
+            await asyncio.sleep(0.05)
+            return {"value": "stale"}
+
+        task = asyncio.create_task(backend.get_or_set("c", slow_factory, 10, ["tag"]))
+        await computing.wait()
+        await other_backend.invalidate(["tag"])
+        assert await task == {"value": "stale"} and await backend.get("c") is None
+
+        # a computation which outlives its lock doesn't release a lock taken by other worker meanwhile.
+        async def long_factory() -> dict:
+            await asyncio.sleep(0.3)
+            await other_backend.execute("SET", "todo:lock:d", "other", "PX", 1000)
+            return {"value": "long"}
+
+        await backend.get_or_set("d", long_factory, 10)
+        assert await other_backend.execute("GET", "todo:lock:d") == b"other"
+    finally:
+        await backend.close()
+        await other_backend.close()
+        await server.close()
+    print("RedisBackend works with the fake server.")
+
+def main() -> None:
+    asyncio.run(check())
+
+if __name__ == "__main__":
+    main()
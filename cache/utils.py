@@ -0,0 +1,100 @@
+import asyncio
+import logging
+import os
+from typing import Any, Awaitable, Callable
+
+from dotenv import load_dotenv
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .backends import CacheBackend, MemoryBackend, RedisBackend, RedisError
+
+# settings are read on import and this module is imported before db.database, which loads them too.
+load_dotenv(os.path.join(os.path.curdir, '.env'))
+
+logger = logging.getLogger(__name__)
+
+# empty disables cache. memory:// is for a single worker only, other workers wouldn't see its invalidations.
+CACHE_URL = os.environ.get("CACHE_URL", "")
+CACHE_TTL = int(os.environ.get("CACHE_TTL", 60))
+CACHE_MAX_ENTRIES = int(os.environ.get("CACHE_MAX_ENTRIES", 10000))
+CACHE_POOL_SIZE = int(os.environ.get("CACHE_POOL_SIZE", 10))
+
+_cache: CacheBackend | None = None
+
+def get_cache() -> CacheBackend:
+    """
+    Function to get cache backend set by CACHE_URL: memory:// or redis://host:port/db.
+    Returns:
+        Instance of cache backend shared by the whole process.
+    """
+    global _cache
+    if _cache is None:
+        if CACHE_URL.startswith("redis://"):
+            _cache = RedisBackend(CACHE_URL, CACHE_POOL_SIZE)
+        else:
+            _cache = MemoryBackend(CACHE_MAX_ENTRIES)
+    return _cache
+
+async def close_cache() -> None:
+    global _cache
+    if _cache is not None:
+        await _cache.close()
+        _cache = None
+
+async def cached(session: AsyncSession, key: str, tags: list[str], factory: Callable[[], Awaitable[Any]]) -> Any:
+    """
+    Function to get a value from cache or compute it with factory and store it.
+    Values read inside not committed atomic batch aren't stored, because they may be rolled back.
+    Without CACHE_URL a value is always computed.
+    Args:
+        session: instance of current session with database.
+        key: key of a value.
+        tags: tags which invalidate a value.
+        factory: coroutine function which computes a value.
+    Returns:
+        JSON compatible value.
+    """
+    async def compute() -> Any:
+        return jsonable_encoder(await factory())
+
+    if not CACHE_URL or session.info.get("defer_commit"):
+        return await compute()
+    try:
+        return await get_cache().get_or_set(key, compute, CACHE_TTL, tags)
+    except (OSError, RedisError, asyncio.IncompleteReadError):
+        # unavailable cache server makes requests slower but doesn't break them.
+        logger.exception("Cache is unavailable.")
+        return await compute()
+
+def invalidate_on_commit(session: AsyncSession, *tags: str) -> None:
+    """
+    Function to mark tags which will be invalidated after the next commit with session_commit.
+    Args:
+        session: instance of current session with database.
+        tags: tags of changed data.
+    """
+    session.info.setdefault("invalidated_tags", set()).update(tags)
+
+async def invalidate(*tags: str) -> None:
+    """
+    Function to invalidate tags right now. Errors of cache server are logged, data in it expires anyway.
+    Args:
+        tags: tags of changed data.
+    """
+    if not CACHE_URL:
+        return
+    try:
+        await get_cache().invalidate(list(tags))
+    except Exception:
+        logger.exception("Cache tags %s weren't invalidated.", tags)
+
+def principal_tag(email: str) -> str:
+    return f"principal:{email}"
+
+def user_lists_tag(user_id: int) -> str:
+    return f"user:{user_id}:lists"
+
+def list_tags(list_id: int, user_id: int) -> tuple[str, str]:
+    # change of a list changes all lists of its owner too.
+    return f"list:{list_id}", user_lists_tag(user_id)
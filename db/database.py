@@ -3,33 +3,159 @@ from typing import AsyncIterable
 
 import sqlalchemy
 from fastapi import HTTPException
-from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, create_async_engine
 from sqlalchemy.orm import sessionmaker
 from dotenv import load_dotenv
 
+from cache.utils import invalidate
+
 load_dotenv(os.path.join(os.path.curdir, '.env'))
 
 SQLACHEMY_DATABASE_URL = os.environ.get("DB_URL")
+# compiled forms of statements kept by SQLAlchemy. Every combination of sparse fields is a separate statement.
+DB_QUERY_CACHE_SIZE = int(os.environ.get("DB_QUERY_CACHE_SIZE", 1000))
+# prepared statements kept by asyncpg on every connection. 0 disables them, e.g. behind pgbouncer in transaction mode.
+DB_PREPARED_STATEMENT_CACHE_SIZE = int(os.environ.get("DB_PREPARED_STATEMENT_CACHE_SIZE", 500))
+# comma-separated URLs of databases with lists and tasks of users, see db.sharding. Users stay in DB_URL database.
+DB_SHARD_URLS = [url.strip() for url in os.environ.get("DB_SHARD_URLS", "").split(",") if url.strip()]
+
+def get_database_url(url: str) -> sqlalchemy.engine.URL:
+    """
+    Function to add driver settings to database URL.
+    Args:
+        url: database URL from settings.
+    Returns:
+        URL which engine is created with.
+    """
+    database_url = sqlalchemy.engine.make_url(url)
+    # asyncpg dialect reads size of its statement cache from URL. Explicit value in DB_URL is kept.
+    if database_url.get_driver_name() == "asyncpg" and "prepared_statement_cache_size" not in database_url.query:
+        database_url = database_url.update_query_dict(
+            {"prepared_statement_cache_size": str(DB_PREPARED_STATEMENT_CACHE_SIZE)}
+        )
+    return database_url
 
-engine = create_async_engine(SQLACHEMY_DATABASE_URL, future=True)
 metadata = sqlalchemy.MetaData()
 
+# engine and sessionmaker are created on first use, so modules can be imported (e.g. by alembic or tools)
+# without settings of database and without paying for creation of engine.
+_engine: AsyncEngine | None = None
+_sessionmaker: sessionmaker | None = None
+
+def get_engine() -> AsyncEngine:
+    """
+    Function to get engine of the database, it's created on the first call.
+    Returns:
+        Instance of AsyncEngine shared by the whole process.
+    """
+    global _engine
+    if _engine is None:
+        _engine = create_async_engine(
+            get_database_url(SQLACHEMY_DATABASE_URL),
+            future=True,
+            query_cache_size=DB_QUERY_CACHE_SIZE
+        )
+    return _engine
+
+def get_sessionmaker() -> sessionmaker:
+    """
+    Function to get factory of sessions bound to the engine, it's created on the first call.
+    Returns:
+        Instance of sessionmaker shared by the whole process.
+    """
+    global _sessionmaker
+    if _sessionmaker is None:
+        _sessionmaker = sessionmaker(
+            get_engine(),
+            class_=AsyncSession,
+            expire_on_commit=False
+        )
+    return _sessionmaker
+
+def async_session() -> AsyncSession:
+    """
+    Function to create new session with the database. Used as `async with async_session() as session`.
+    Returns:
+        Instance of AsyncSession.
+    """
+    return get_sessionmaker()()
+
+_shard_engines: dict[int, AsyncEngine] = {}
+_shard_sessionmakers: dict[int, sessionmaker] = {}
+
+def get_shard_engine(shard: int) -> AsyncEngine:
+    """
+    Function to get engine of a shard, it's created on the first call.
+    Args:
+        shard: index of a shard in DB_SHARD_URLS.
+    Returns:
+        Instance of AsyncEngine shared by the whole process.
+    """
+    if shard not in _shard_engines:
+        _shard_engines[shard] = create_async_engine(
+            get_database_url(DB_SHARD_URLS[shard]),
+            future=True,
+            query_cache_size=DB_QUERY_CACHE_SIZE
+        )
+    return _shard_engines[shard]
+
+def get_shard_sessionmaker(shard: int) -> sessionmaker:
+    """
+    Function to get factory of sessions bound to a shard, it's created on the first call.
+    Args:
+        shard: index of a shard in DB_SHARD_URLS.
+    Returns:
+        Instance of sessionmaker shared by the whole process.
+    """
+    if shard not in _shard_sessionmakers:
+        _shard_sessionmakers[shard] = sessionmaker(
+            get_shard_engine(shard),
+            class_=AsyncSession,
+            expire_on_commit=False
+        )
+    return _shard_sessionmakers[shard]
+
+def shard_session(shard: int | None) -> AsyncSession:
+    """
+    Function to create new session with a shard. Used as `async with shard_session(shard) as session`.
+    Args:
+        shard: index of a shard in DB_SHARD_URLS or None for the main database when sharding is disabled.
+    Returns:
+        Instance of AsyncSession.
+    """
+    session = async_session() if shard is None else get_shard_sessionmaker(shard)()
+    session.info["shard"] = shard
+    return session
+
+def data_shards() -> list[int | None]:
+    """
+    Function to get shards which keep lists and tasks, periodic jobs process every one of them.
+    Returns:
+        Indexes of shards or [None] for the main database when sharding is disabled.
+    """
+    return list(range(len(DB_SHARD_URLS))) or [None]
+
 async def init_db():
-    async with engine.begin() as conn:
+    async with get_engine().begin() as conn:
         await conn.run_sync(metadata.create_all)
+    for shard in range(len(DB_SHARD_URLS)):
+        async with get_shard_engine(shard).begin() as conn:
+            await conn.run_sync(metadata.create_all)
 
 async def get_session() -> AsyncIterable[AsyncSession]:
-    async_session = sessionmaker(
-        engine,
-        class_=AsyncSession,
-        expire_on_commit=False
-    )
     async with async_session() as session:
         yield session
 
 async def session_commit(error, exception: HTTPException, session: AsyncSession) -> None:
     try:
-        await session.commit()
+        if session.info.get("defer_commit"): # atomic batch commits all its operations at once.
+            await session.flush()
+        else:
+            await session.commit()
+            # cached data is invalidated only when its changes are visible to other sessions.
+            tags = session.info.pop("invalidated_tags", None)
+            if tags:
+                await invalidate(*tags)
     except error as _:
         await session.rollback()
         raise exception
@@ -1,4 +1,4 @@
-from sqlalchemy import Boolean, Column, ForeignKey, Integer, String, Text, Time, Table
+from sqlalchemy import Boolean, Column, DateTime, ForeignKey, Index, Integer, String, Text, Time, Table, false, func, true
 
 from .database import metadata
 
@@ -10,7 +10,17 @@ users = Table(
     Column("lastname", String, index=True),
     Column("email", String, unique=True, index=True),
     Column("hashed_password", String, index=True),
-    Column("disabled", Boolean)
+    Column("disabled", Boolean),
+    # time of registration, unverified users are deleted some time after it by users.utils.cleanup.
+    Column("created_at", DateTime, server_default=func.now())
+)
+
+# only unverified users are searched by registration time, so verified ones are kept out of the index.
+Index(
+    "ix_users_unverified_created_at",
+    users.c.created_at,
+    postgresql_where=users.c.disabled.is_(true()),
+    sqlite_where=users.c.disabled.is_(true())
 )
 
 task = Table(
@@ -20,7 +30,28 @@ task = Table(
     Column("task", String, index=True),
     Column("time", Time),
     Column("description", Text, index=True),
-    Column("done", Boolean)
+    Column("done", Boolean),
+    Column("completed_at", DateTime),
+    # owner of a task copied from its list, so tasks are queried without joins. Partition key of task table, see db.partition_tasks.
+    Column("user_id", Integer, ForeignKey("users.id"), index=True)
+)
+
+# agenda queries look only for not completed tasks, so completed ones are kept out of the index.
+Index(
+    "ix_task_pending_time",
+    task.c.user_id,
+    task.c.time,
+    task.c.id,
+    postgresql_where=task.c.done.is_(false()),
+    sqlite_where=task.c.done.is_(false())
+)
+
+# archiving looks only for completed tasks in order of completion, see tasks.utils.archive_tasks.
+Index(
+    "ix_task_done_completed_at",
+    task.c.completed_at,
+    postgresql_where=task.c.done.is_(true()),
+    sqlite_where=task.c.done.is_(true())
 )
 
 todolist = Table(
@@ -28,7 +59,10 @@ todolist = Table(
     metadata,
     Column("id", Integer, primary_key=True, index=True),
     Column("name", String, index=True),
-    Column("user_id", Integer, ForeignKey("users.id"))
+    Column("user_id", Integer, ForeignKey("users.id"), index=True),
+    # denormalized counters, kept in sync by tasks.services and repaired by todolists.utils.reconcile_counters.
+    Column("task_count", Integer, nullable=False, default=0, server_default="0"),
+    Column("done_count", Integer, nullable=False, default=0, server_default="0")
 )
 
 task_list = Table(
@@ -36,5 +70,73 @@ task_list = Table(
     metadata,
     Column("list_id", Integer, ForeignKey("todolist.id")),
     Column("task_id", Integer, ForeignKey("task.id"), unique=True),
-    Column("pk", Integer, primary_key=True, index=True)
+    Column("pk", Integer, primary_key=True, index=True),
+    # owner of a task copied from it, partitioned task table is referenced by (task_id, user_id), see db.partition_tasks.
+    Column("user_id", Integer),
+    # lexicographic rank of a task in a list, see tasks.utils.rank_between. Compared byte by byte, because
+    # locale collations put e.g. "kV" before "V" while ranks use both cases of letters as different digits.
+    # SQLite (used by benchmarks) has no C collation but compares strings byte by byte anyway.
+    Column("position", String().with_variant(String(collation="C"), "postgresql")),
+    Index("ix_task_list_list_id_position", "list_id", "position")
+)
+
+# completed tasks moved out of task table by tasks.utils.archive_tasks.
+task_archive = Table(
+    "task_archive",
+    metadata,
+    Column("id", Integer, primary_key=True), # id of a task in task table.
+    Column("task", String),
+    Column("time", Time),
+    Column("description", Text),
+    Column("list_id", Integer),
+    Column("user_id", Integer),
+    Column("completed_at", DateTime),
+    Column("archived_at", DateTime),
+    Index("ix_task_archive_user_id_completed_at", "user_id", "completed_at")
+)
+
+# first responses of requests with Idempotency-Key header, see middlewares.idempotency.
+idempotency_key = Table(
+    "idempotency_key",
+    metadata,
+    Column("key", String, primary_key=True), # hash of user's token, endpoint and key sent by client.
+    Column("fingerprint", String), # hash of request body.
+    Column("status_code", Integer), # None while the first request is being processed.
+    Column("content_type", String),
+    Column("body", Text),
+    Column("created_at", DateTime, index=True),
+    Column("locked_at", DateTime) # when the request which processes the key started, it owns the key until it's stored.
+)
+
+# the latest revision of data of every user, increased by every change, see sync.utils.record_changes.
+sync_revision = Table(
+    "sync_revision",
+    metadata,
+    Column("user_id", Integer, primary_key=True, autoincrement=False),
+    Column("revision", Integer, nullable=False, default=0, server_default="0"),
+    # changes up to this revision were deleted from change_log, clients with older revisions get all data.
+    Column("pruned_revision", Integer, nullable=False, default=0, server_default="0")
+)
+
+# lists and tasks changed in every revision, returned by /api/v1/sync.
+change_log = Table(
+    "change_log",
+    metadata,
+    Column("id", Integer, primary_key=True),
+    Column("user_id", Integer),
+    Column("revision", Integer),
+    Column("entity", String), # list or task.
+    Column("entity_id", Integer),
+    Column("deleted", Boolean),
+    Column("changed_at", DateTime, index=True),
+    Index("ix_change_log_user_id_revision", "user_id", "revision")
+)
+
+# shards of users moved from the shard chosen by id, see db.sharding. Kept in the main database only.
+shard_map = Table(
+    "shard_map",
+    metadata,
+    Column("user_id", Integer, primary_key=True, autoincrement=False),
+    Column("shard", Integer, nullable=False),
+    Column("moving", Boolean, nullable=False, default=False, server_default=false()) # True while data is copied.
 )
@@ -0,0 +1,153 @@
+"""
+Tool to move lists and tasks of a user to other shard, e.g. to balance load between shards.
+Requests of the user are answered with 503 while data is copied. Running it with the current shard of a user
+pins the user there, which has to be done before amount of shards in DB_SHARD_URLS changes.
+Run from the repository root: python -m db.move_user <user_id> <shard>
+"""
+import asyncio
+import os
+import sys
+
+import sqlalchemy
+from sqlalchemy.ext.asyncio import AsyncSession, AsyncResult
+
+from cache.utils import invalidate, list_tags, user_lists_tag
+from db import models
+from db.database import DB_SHARD_URLS, async_session, shard_session
+from db.sharding import delete_user_data, find_shard, mirror_user
+
+# seconds to wait after requests of a user are stopped, so requests which are running already can finish.
+SHARD_MOVE_GRACE = float(os.environ.get("SHARD_MOVE_GRACE", 5))
+
+async def set_shard(user_id: int, shard: int, moving: bool) -> None:
+    """
+    Function to save a shard of a user in shard map of the main database.
+    Args:
+        user_id: id of a user.
+        shard: index of a shard.
+        moving: whether requests of a user have to be stopped.
+    """
+    async with async_session() as session:
+        query_update = models.shard_map.update().where(models.shard_map.c.user_id == user_id).values(
+            shard=shard,
+            moving=moving
+        )
+        result: AsyncResult = await session.execute(query_update)
+        if not result.rowcount:
+            await session.execute(models.shard_map.insert().values(user_id=user_id, shard=shard, moving=moving))
+        await session.commit()
+
+async def check_ids(rows: dict[sqlalchemy.Table, list[dict]], session: AsyncSession) -> None:
+    """
+    Function to check that ids of moved lists and tasks aren't used by other users in the target shard,
+    which happens when shards don't have their own ranges of ids.
+    Args:
+        rows: moved rows of every table.
+        session: instance of session with the target shard, leftovers of the user are deleted from it already.
+    """
+    for table in (models.todolist, models.task, models.task_archive):
+        ids = [item["id"] for item in rows[table]]
+        if not ids:
+            continue
+        result: AsyncResult = await session.execute(sqlalchemy.select(table.c.id).where(table.c.id.in_(ids)))
+        used = result.scalars().all()
+        if used:
+            raise ValueError(f"Ids {sorted(used)} of {table.name} are used in the target shard already.")
+
+async def move_user(user_id: int, target: int) -> dict[str, int]:
+    """
+    Function to move lists, tasks and change log of a user to other shard keeping their ids.
+    Args:
+        user_id: id of a user.
+        target: index of a shard where data will be moved.
+    Returns:
+        Dictionary with amounts of moved rows of every table.
+    """
+    async with async_session() as session:
+        source, _ = await find_shard(user_id, session)
+    if source == target:
+        await set_shard(user_id, target, moving=False)
+        return {}
+
+    await set_shard(user_id, source, moving=True)
+    try:
+        await asyncio.sleep(SHARD_MOVE_GRACE)
+        rows = await copy_user_data(user_id, source, target)
+    except BaseException:
+        await set_shard(user_id, source, moving=False) # the user stays in the source shard.
+        raise
+
+    # shard map is changed before data is deleted from the source, so the user never stays without data.
+    await set_shard(user_id, target, moving=False)
+    async with shard_session(source) as session:
+        await delete_user_data(user_id, session)
+        await session.commit()
+
+    await invalidate(
+        user_lists_tag(user_id),
+        *{tag for item in rows[models.todolist] for tag in list_tags(item["id"], user_id)}
+    )
+    return {table.name: len(items) for table, items in rows.items()}
+
+async def copy_user_data(user_id: int, source: int, target: int) -> dict[sqlalchemy.Table, list[dict]]:
+    """
+    Function to copy data of a user to the target shard.
+    Args:
+        user_id: id of a user.
+        source: index of the current shard of a user.
+        target: index of a shard where data will be moved.
+    Returns:
+        Moved rows of every table.
+    """
+    async with shard_session(source) as source_session, shard_session(target) as target_session:
+        rows = {}
+        # ids of lists and tasks are kept, clients know them. Other ids are generated by the target shard.
+        for table, condition, excluded in (
+            (models.todolist, models.todolist.c.user_id == user_id, ()),
+            (models.task, models.task.c.user_id == user_id, ()),
+            (
+                models.task_list,
+                models.task_list.c.list_id.in_(
+                    sqlalchemy.select(models.todolist.c.id).where(models.todolist.c.user_id == user_id)
+                ),
+                ("pk",)
+            ),
+            (models.task_archive, models.task_archive.c.user_id == user_id, ()),
+            (models.sync_revision, models.sync_revision.c.user_id == user_id, ()),
+            (models.change_log, models.change_log.c.user_id == user_id, ("id",)),
+        ):
+            columns = [column for column in table.c if column.name not in excluded]
+            result: AsyncResult = await source_session.execute(sqlalchemy.select(*columns).where(condition))
+            rows[table] = [item._asdict() for item in result.all()]
+
+        await mirror_user(user_id, target_session)
+        await delete_user_data(user_id, target_session) # leftovers of a failed move.
+        await check_ids(rows, target_session)
+        for table, items in rows.items():
+            if items:
+                await target_session.execute(table.insert(), items)
+        await target_session.commit()
+    return rows
+
+def main() -> None:
+    if len(sys.argv) != 3 or not DB_SHARD_URLS:
+        print("Usage: python -m db.move_user <user_id> <shard>, DB_SHARD_URLS has to be set.")
+        sys.exit(1)
+
+    user_id, target = int(sys.argv[1]), int(sys.argv[2])
+    if not 0 <= target < len(DB_SHARD_URLS):
+        print(f"Shard has to be from 0 to {len(DB_SHARD_URLS) - 1}.")
+        sys.exit(1)
+
+    try:
+        moved = asyncio.run(move_user(user_id, target))
+    except ValueError as e:
+        print(f"User {user_id} isn't moved. {e}")
+        sys.exit(1)
+    if not moved:
+        print(f"User {user_id} is pinned to shard {target}.")
+    for table, count in moved.items():
+        print(f"{table}: {count} rows moved to shard {target}.")
+
+if __name__ == "__main__":
+    main()
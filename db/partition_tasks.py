@@ -0,0 +1,117 @@
+"""
+Tool to hash-partition task table by owner for big deployments or to turn it back into a plain table with 0 partitions.
+Rows are copied in one transaction which locks task and task_list tables, so writes of tasks wait until it ends.
+Works with PostgreSQL only. With DB_SHARD_URLS task table of every shard is rebuilt.
+Run from the repository root: python -m db.partition_tasks <partitions>
+"""
+import asyncio
+import sys
+
+import sqlalchemy
+from sqlalchemy.ext.asyncio import AsyncSession, AsyncResult
+
+from db.database import data_shards, shard_session
+
+INDEXES = [
+    "CREATE INDEX ix_task_id ON task (id)",
+    "CREATE INDEX ix_task_task ON task (task)",
+    "CREATE INDEX ix_task_description ON task (description)",
+    "CREATE INDEX ix_task_user_id ON task (user_id)",
+    "CREATE INDEX ix_task_pending_time ON task (user_id, time, id) WHERE done IS false",
+    "CREATE INDEX ix_task_done_completed_at ON task (completed_at) WHERE done IS true",
+]
+
+async def is_partitioned(session: AsyncSession) -> bool:
+    query = sqlalchemy.text("SELECT 1 FROM pg_partitioned_table WHERE partrelid = 'task'::regclass")
+    result: AsyncResult = await session.execute(query)
+    return bool(result.scalar())
+
+async def partition_tasks(partitions: int, session: AsyncSession) -> bool:
+    """
+    Function to rebuild task table with given amount of hash partitions by user_id and commit it.
+    Args:
+        partitions: amount of partitions, 0 for a plain table.
+        session: instance of session with a database which keeps tasks.
+    Returns:
+        Whether the table was rebuilt.
+    """
+    partitioned = await is_partitioned(session)
+    if not partitions and not partitioned:
+        return False
+
+    # writes wait until the new table is ready instead of getting lost, reads go on until the old table is dropped.
+    await session.execute(sqlalchemy.text("LOCK TABLE task, task_list IN EXCLUSIVE MODE"))
+    if partitions:
+        # primary key of a partitioned table has to contain partition key.
+        statements = [
+            """
+            CREATE TABLE task_new (
+                LIKE task INCLUDING DEFAULTS,
+                PRIMARY KEY (id, user_id),
+                FOREIGN KEY (user_id) REFERENCES users (id)
+            ) PARTITION BY HASH (user_id)
+            """
+        ] + [
+            f"CREATE TABLE task_new_p{remainder} PARTITION OF task_new "
+            f"FOR VALUES WITH (MODULUS {partitions}, REMAINDER {remainder})"
+            for remainder in range(partitions)
+        ]
+    else:
+        statements = [
+            """
+            CREATE TABLE task_new (
+                LIKE task INCLUDING DEFAULTS,
+                PRIMARY KEY (id),
+                FOREIGN KEY (user_id) REFERENCES users (id)
+            )
+            """
+        ]
+    for statement in statements:
+        await session.execute(sqlalchemy.text(statement))
+    # tasks without owner don't belong to any list, so they can't be reached and aren't copied.
+    await session.execute(sqlalchemy.text("INSERT INTO task_new SELECT * FROM task WHERE user_id IS NOT NULL"))
+
+    # sequence of ids is owned by old table, so it has to be moved before the old table is dropped.
+    await session.execute(sqlalchemy.text("ALTER SEQUENCE task_id_seq OWNED BY NONE"))
+    # drops partitions of the old table and foreign key of task_list, it's created again below.
+    await session.execute(sqlalchemy.text("DROP TABLE task CASCADE"))
+    for statement in [
+        "ALTER TABLE task_new RENAME TO task",
+        "ALTER TABLE task RENAME CONSTRAINT task_new_pkey TO task_pkey",
+        "ALTER TABLE task RENAME CONSTRAINT task_new_user_id_fkey TO task_user_id_fkey",
+        "ALTER SEQUENCE task_id_seq OWNED BY task.id",
+    ] + [
+        f"ALTER TABLE task_new_p{remainder} RENAME TO task_p{remainder}" for remainder in range(partitions)
+    ] + INDEXES:
+        await session.execute(sqlalchemy.text(statement))
+
+    # partitioned table is unique only by (id, user_id), so task_list refers to a task together with its owner.
+    task_columns = "task_id, user_id" if partitions else "task_id"
+    key_columns = "id, user_id" if partitions else "id"
+    await session.execute(sqlalchemy.text(
+        f"ALTER TABLE task_list ADD CONSTRAINT task_list_task_id_fkey "
+        f"FOREIGN KEY ({task_columns}) REFERENCES task ({key_columns})"
+    ))
+    await session.commit()
+    return True
+
+async def partition_all(partitions: int) -> None:
+    for shard in data_shards():
+        async with shard_session(shard) as session:
+            name = "main database" if shard is None else f"shard {shard}"
+            if session.bind.dialect.name != "postgresql":
+                print(f"Task table of {name} isn't changed, partitioning works with PostgreSQL only.")
+            elif await partition_tasks(partitions, session):
+                print(f"Task table of {name} is rebuilt with {partitions} partitions.")
+            else:
+                print(f"Task table of {name} isn't partitioned already.")
+
+def main() -> None:
+    if len(sys.argv) != 2 or not sys.argv[1].isdigit():
+        print("Usage: python -m db.partition_tasks <partitions>, 0 turns task table back into a plain one.")
+        sys.exit(1)
+
+    asyncio.run(partition_all(int(sys.argv[1])))
+
+if __name__ == "__main__":
+    main()
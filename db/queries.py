@@ -0,0 +1,121 @@
+"""
+Queries of the most frequent requests built once with bound parameters instead of in every request.
+Statement objects are reused, so SQLAlchemy finds their compiled form in the engine's query cache without
+building them again and the database driver reuses one prepared statement for all requests.
+Values are passed on execution, e.g. session.execute(queries.user_by_email, {"email": email}).
+"""
+from functools import lru_cache
+from typing import Callable
+
+import sqlalchemy
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.sql import Insert
+
+from db import models
+
+user_by_email = models.users.select().where(models.users.c.email == sqlalchemy.bindparam("email"))
+
+# columns which authentication needs, password hash isn't read, so it never gets to the cache.
+principal_by_email = sqlalchemy.select(
+    models.users.c.id,
+    models.users.c.firstname,
+    models.users.c.lastname,
+    models.users.c.email,
+    models.users.c.disabled
+).where(models.users.c.email == sqlalchemy.bindparam("email"))
+
+# the same condition as tasks.utils.owned_task, so the partitioned task table is scanned in one partition only.
+owned_task = (models.task.c.id == sqlalchemy.bindparam("task_id")) & (models.task.c.user_id == sqlalchemy.bindparam("user_id"))
+
+task_by_owner = models.task.select().where(owned_task)
+
+task_state_by_owner = sqlalchemy.select(models.task.c.done, models.task_list.c.list_id).join(
+    models.task_list, models.task.c.id == models.task_list.c.task_id
+).where(owned_task)
+
+list_id_by_task = sqlalchemy.select(models.task_list.c.list_id).where(
+    models.task_list.c.task_id == sqlalchemy.bindparam("task_id")
+)
+
+last_position = sqlalchemy.select(sqlalchemy.func.max(models.task_list.c.position)).where(
+    models.task_list.c.list_id == sqlalchemy.bindparam("list_id")
+)
+
+# parameters of SET clause can't be named as columns, so differences are passed as task_delta and done_delta.
+update_counters = models.todolist.update().where(models.todolist.c.id == sqlalchemy.bindparam("list_id")).values(
+    task_count=models.todolist.c.task_count + sqlalchemy.bindparam("task_delta"),
+    done_count=models.todolist.c.done_count + sqlalchemy.bindparam("done_delta")
+)
+
+# revision row stays locked until commit, so changes of one user are committed in order of their revisions.
+# Row of a user without it is created by the first change, concurrent first changes bump it instead of failing.
+# user_id is a column of inserted table, so the parameter is named owner_id.
+def _upsert_revision(insert: Callable[[sqlalchemy.Table], Insert]) -> Insert:
+    return insert(models.sync_revision).values(
+        user_id=sqlalchemy.bindparam("owner_id"),
+        revision=1
+    ).on_conflict_do_update(
+        index_elements=[models.sync_revision.c.user_id],
+        set_={"revision": models.sync_revision.c.revision + 1}
+    )
+
+# upsert is chosen by name of the session's dialect. SQLAlchemy 1.4 can't render RETURNING for SQLite,
+# so there the new revision is read by user_revision after the upsert.
+bump_revision = {
+    "postgresql": _upsert_revision(postgresql.insert).returning(models.sync_revision.c.revision),
+    "sqlite": _upsert_revision(sqlite.insert)
+}
+
+user_revision = sqlalchemy.select(models.sync_revision.c.revision, models.sync_revision.c.pruned_revision).where(
+    models.sync_revision.c.user_id == sqlalchemy.bindparam("user_id")
+)
+
+lists_summary = sqlalchemy.select(
+    models.todolist.c.id,
+    models.todolist.c.name,
+    models.todolist.c.task_count,
+    models.todolist.c.done_count
+).where(models.todolist.c.user_id == sqlalchemy.bindparam("user_id"))
+
+# statements below depend on requested fields, so one statement is kept for every combination of fields.
+@lru_cache(maxsize=64)
+def lists_by_user(fields: tuple[str, ...]) -> sqlalchemy.sql.Select:
+    """
+    Function to get a query of lists of a user.
+    Args:
+        fields: names of todolist columns which will be selected.
+    Returns:
+        Select statement with user_id parameter.
+    """
+    columns = [models.todolist.c[field] for field in fields]
+    return sqlalchemy.select(*columns).where(models.todolist.c.user_id == sqlalchemy.bindparam("user_id"))
+
+@lru_cache(maxsize=64)
+def list_by_id(fields: tuple[str, ...]) -> sqlalchemy.sql.Select:
+    """
+    Function to get a query of a list by its id.
+    Args:
+        fields: names of todolist columns which will be selected.
+    Returns:
+        Select statement with list_id parameter.
+    """
+    columns = [models.todolist.c[field] for field in fields]
+    return sqlalchemy.select(*columns).where(models.todolist.c.id == sqlalchemy.bindparam("list_id"))
+
+@lru_cache(maxsize=64)
+def tasks_of_lists(fields: tuple[str, ...]) -> sqlalchemy.sql.Select:
+    """
+    Function to get a query of tasks of several lists ordered by their position.
+    Args:
+        fields: names of task columns which will be selected.
+    Returns:
+        Select statement with list_ids (expanded to a list of ids) and user_id parameters.
+    """
+    columns = [models.task.c[field] for field in fields]
+    # user_id condition is redundant for lists of this user but keeps the query in one partition of task table.
+    return sqlalchemy.select(models.task_list.c.list_id, *columns).join(
+        models.task, models.task.c.id == models.task_list.c.task_id
+    ).where(
+        models.task_list.c.list_id.in_(sqlalchemy.bindparam("list_ids", expanding=True)),
+        models.task.c.user_id == sqlalchemy.bindparam("user_id")
+    ).order_by(models.task_list.c.list_id, models.task_list.c.position, models.task_list.c.pk)
@@ -0,0 +1,43 @@
+import asyncio
+import logging
+from typing import Awaitable, Callable
+
+logger = logging.getLogger(__name__)
+
+_jobs: list[tuple[Callable[[], Awaitable[None]], float]] = []
+_running: list[asyncio.Task] = []
+
+def schedule(job: Callable[[], Awaitable[None]], interval: float) -> None:
+    """
+    Function to register a job which will be run periodically in the application's event loop.
+    Args:
+        job: coroutine function without arguments. It has to open its own session with database.
+        interval: seconds between two runs. Non-positive value disables the job.
+    """
+    if interval > 0:
+        _jobs.append((job, interval))
+
+async def _run_periodically(job: Callable[[], Awaitable[None]], interval: float) -> None:
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            await job()
+        except Exception:
+            # a failed run must not stop next ones.
+            logger.exception("Scheduled job %s failed.", job.__name__)
+
+def start_jobs() -> None:
+    """
+    Function to start all registered jobs. Should be called on application startup.
+    """
+    for job, interval in _jobs:
+        _running.append(asyncio.create_task(_run_periodically(job, interval)))
+
+async def stop_jobs() -> None:
+    """
+    Function to cancel running jobs. Should be called on application shutdown.
+    """
+    for task in _running:
+        task.cancel()
+    await asyncio.gather(*_running, return_exceptions=True)
+    _running.clear()
@@ -13,9 +13,8 @@ class UserCreate(UserBase):
     password: str
 
 
-class User(UserBase):
+class Principal(UserBase):
     id: int
-    hashed_password: str
     disabled: bool
 
     class Config:
@@ -23,6 +22,10 @@ class User(UserBase):
         arbitrary_types_allowed = True
 
 
+class User(Principal):
+    hashed_password: str
+
+
 class TaskBase(BaseModel):
     task: str
     time: dt.time
@@ -41,6 +44,27 @@ class Task(TaskBase):
         orm_mode = True
 
 
+class UpcomingTask(Task):
+    list_id: int
+
+
+class SyncTask(UpcomingTask):
+    position: str # rank of a task in its list, tasks of a list are ordered by it.
+
+
+class ArchivedTask(TaskBase):
+    id: int
+    list_id: int
+    completed_at: dt.datetime
+
+    class Config:
+        orm_mode = True
+
+
+class TaskMove(BaseModel):
+    after_id: int | None = None # id of a task after which moved task will be placed. None moves it to the top.
+
+
 class ListBase(BaseModel):
     name: str
 
@@ -53,7 +77,38 @@ class List(ListBase):
     id: int
     tasks: list[Task] = []
     user_id: int
+    task_count: int | None = None
+    done_count: int | None = None
 
     class Config:
         orm_mode = True
         arbitrary_types_allowed = True
+
+
+class ListSummary(ListBase):
+    id: int
+    task_count: int
+    done_count: int
+
+    class Config:
+        orm_mode = True
+
+
+class TaskFields(BaseModel):
+    id: int | None
+    task: str | None
+    time: dt.time | None
+    description: str | None
+    done: bool | None
+
+
+class ListFields(BaseModel):
+    """
+    List with only requested fields, used with response_model_exclude_unset to omit not requested ones.
+    """
+    id: int | None
+    name: str | None
+    user_id: int | None
+    task_count: int | None
+    done_count: int | None
+    tasks: list[TaskFields] | None
@@ -0,0 +1,84 @@
+"""
+Routing of users' lists and tasks to shards set by DB_SHARD_URLS.
+A user lives in shard user_id % amount of shards unless shard_map table of the main database says otherwise.
+Users themselves are kept in the main database, shards get a copy of user's id only, because lists and tasks refer to it.
+"""
+from fastapi import HTTPException, status
+import sqlalchemy
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession, AsyncResult
+
+from db import models
+from db.database import DB_SHARD_URLS
+
+async def find_shard(user_id: int, session: AsyncSession) -> tuple[int, bool]:
+    """
+    Function to find a shard of a user.
+    Args:
+        user_id: id of a user.
+        session: instance of session with the main database.
+    Returns:
+        Index of a shard and whether user's data is being moved to other shard right now.
+    """
+    query = sqlalchemy.select(models.shard_map.c.shard, models.shard_map.c.moving).where(
+        models.shard_map.c.user_id == user_id
+    )
+    result: AsyncResult = await session.execute(query)
+    item = result.one_or_none()
+    if item is None:
+        return user_id % len(DB_SHARD_URLS), False
+    return item.shard, item.moving
+
+async def get_user_shard(user_id: int, session: AsyncSession) -> int | None:
+    """
+    Function to get a shard with lists and tasks of a user.
+    Args:
+        user_id: id of a user.
+        session: instance of session with the main database.
+    Returns:
+        Index of a shard or None if sharding is disabled.
+    """
+    if not DB_SHARD_URLS:
+        return None
+
+    shard, moving = await find_shard(user_id, session)
+    if moving: # changes made during moving would be lost.
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Your data is being moved, try again in a few seconds.",
+            headers={"Retry-After": "5"}
+        )
+    return shard
+
+async def mirror_user(user_id: int, session: AsyncSession) -> None:
+    """
+    Function to copy id of a user to a shard before the first change of its data there.
+    Args:
+        user_id: id of a user.
+        session: instance of session with a shard.
+    """
+    # the copy is looked for on every request, a copy remembered by a process could be deleted by other one.
+    query = sqlalchemy.select(models.users.c.id).where(models.users.c.id == user_id)
+    result: AsyncResult = await session.execute(query)
+    if result.scalar() is None:
+        try:
+            await session.execute(models.users.insert().values(id=user_id))
+            await session.execute(models.sync_revision.insert().values(user_id=user_id, revision=0))
+            await session.commit()
+        except IntegrityError: # copied by a concurrent request.
+            await session.rollback()
+
+async def delete_user_data(user_id: int, session: AsyncSession) -> None:
+    """
+    Function to delete lists, tasks and change log of a user. Doesn't commit.
+    Args:
+        user_id: id of a user.
+        session: instance of session with a shard or with the main database when sharding is disabled.
+    """
+    list_ids = sqlalchemy.select(models.todolist.c.id).where(models.todolist.c.user_id == user_id)
+    await session.execute(models.task_list.delete().where(models.task_list.c.list_id.in_(list_ids)))
+    await session.execute(models.task.delete().where(models.task.c.user_id == user_id))
+    await session.execute(models.task_archive.delete().where(models.task_archive.c.user_id == user_id))
+    await session.execute(models.todolist.delete().where(models.todolist.c.user_id == user_id))
+    await session.execute(models.change_log.delete().where(models.change_log.c.user_id == user_id))
+    await session.execute(models.sync_revision.delete().where(models.sync_revision.c.user_id == user_id))
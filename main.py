@@ -1,7 +1,18 @@
+import os
+
 from fastapi import FastAPI
 
+from cache.utils import close_cache
 from db.database import init_db
+from db.scheduler import schedule, start_jobs, stop_jobs
+from middlewares.compression import CompressionMiddleware
+from middlewares.idempotency import IdempotencyMiddleware, purge_idempotency_keys
+from middlewares.profiling import ProfilingMiddleware
 from routers.routers import api_router
+from sync.utils import prune_change_log
+from tasks.utils import archive_tasks, rebalance_lists
+from todolists.utils import reconcile_counters
+from users.utils.cleanup import purge_unverified_users
 
 app = FastAPI(
     title="Pet ToDo List using FastAPI.",
@@ -9,7 +20,32 @@ app = FastAPI(
 )
 
 app.include_router(api_router)
+app.add_middleware(
+    IdempotencyMiddleware,
+    routes=[
+        ("POST", r"^/api/v1/lists/create$"),
+        ("POST", r"^/api/v1/tasks/\d+/create$"),
+    ]
+)
+# added last to be the outermost one, so replayed idempotent responses are compressed too.
+# responses with tokens aren't compressed because compression of secrets can leak them (BREACH).
+app.add_middleware(CompressionMiddleware, exclude=[r"^/api/v1/users/"])
+# requests to profiles send X-Profile header too, but aren't profiled, so they don't push real profiles out.
+app.add_middleware(ProfilingMiddleware, exclude=[r"^/api/v1/profiling"])
+
+schedule(rebalance_lists, int(os.environ.get("TASK_REBALANCE_INTERVAL", 3600)))
+schedule(archive_tasks, int(os.environ.get("TASK_ARCHIVE_INTERVAL", 3600)))
+schedule(reconcile_counters, int(os.environ.get("COUNTERS_RECONCILE_INTERVAL", 86400)))
+schedule(purge_idempotency_keys, int(os.environ.get("IDEMPOTENCY_PURGE_INTERVAL", 3600)))
+schedule(purge_unverified_users, int(os.environ.get("USER_PURGE_INTERVAL", 3600)))
+schedule(prune_change_log, int(os.environ.get("SYNC_PRUNE_INTERVAL", 86400)))
 
 @app.on_event("startup")
 async def startup():
     await init_db()
+    start_jobs()
+
+@app.on_event("shutdown")
+async def shutdown():
+    await stop_jobs()
+    await close_cache()
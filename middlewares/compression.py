@@ -0,0 +1,165 @@
+import os
+import re
+import zlib
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+# optional encodings, they are offered only when their packages are installed.
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+COMPRESSION_MINIMUM_SIZE = int(os.environ.get("COMPRESSION_MINIMUM_SIZE", 1024))
+GZIP_LEVEL = int(os.environ.get("GZIP_LEVEL", 6))
+BROTLI_QUALITY = int(os.environ.get("BROTLI_QUALITY", 4))
+ZSTD_LEVEL = int(os.environ.get("ZSTD_LEVEL", 3))
+
+
+class GzipCompressor:
+    def __init__(self) -> None:
+        self.compressor = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 31) # 31 means gzip header and trailer.
+
+    def compress(self, data: bytes) -> bytes:
+        return self.compressor.compress(data) + self.compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self, data: bytes) -> bytes:
+        return self.compressor.compress(data) + self.compressor.flush(zlib.Z_FINISH)
+
+
+class BrotliCompressor:
+    def __init__(self) -> None:
+        self.compressor = brotli.Compressor(quality=BROTLI_QUALITY)
+
+    def compress(self, data: bytes) -> bytes:
+        return self.compressor.process(data) + self.compressor.flush()
+
+    def finish(self, data: bytes) -> bytes:
+        return self.compressor.process(data) + self.compressor.finish()
+
+
+class ZstdCompressor:
+    def __init__(self) -> None:
+        self.compressor = zstandard.ZstdCompressor(level=ZSTD_LEVEL).compressobj()
+
+    def compress(self, data: bytes) -> bytes:
+        return self.compressor.compress(data) + self.compressor.flush(zstandard.COMPRESSOBJ_FLUSH_BLOCK)
+
+    def finish(self, data: bytes) -> bytes:
+        return self.compressor.compress(data) + self.compressor.flush()
+
+
+# supported encodings in order of preference when client accepts several of them equally.
+COMPRESSORS = {
+    encoding: compressor for encoding, compressor, available in [
+        ("br", BrotliCompressor, brotli is not None),
+        ("zstd", ZstdCompressor, zstandard is not None),
+        ("gzip", GzipCompressor, True),
+    ] if available
+}
+
+def negotiate_encoding(accept_encoding: str) -> str | None:
+    """
+    Function to choose the best supported encoding from Accept-Encoding header.
+    Args:
+        accept_encoding: value of Accept-Encoding header.
+    Returns:
+        Name of encoding or None if client doesn't accept any supported one.
+    """
+    weights = {}
+    for item in accept_encoding.split(","):
+        encoding, _, params = item.strip().partition(";")
+        weight = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                weight = float(params[2:])
+            except ValueError:
+                weight = 0.0
+        weights[encoding.strip().lower()] = weight
+
+    default = weights.get("*", 0.0)
+    candidates = [(weights.get(encoding, default), -i, encoding) for i, encoding in enumerate(COMPRESSORS)]
+    weight, _, encoding = max(candidates)
+    return encoding if weight > 0 else None
+
+
+class CompressionMiddleware:
+    """
+    Middleware which compresses responses with gzip, brotli or zstd depending on Accept-Encoding header.
+    Small responses are sent as is. Streaming responses are compressed chunk by chunk.
+    Args:
+        app: ASGI application.
+        minimum_size: responses sent in one chunk which are smaller than this amount of bytes aren't compressed.
+        exclude: regular expressions of paths which responses are never compressed.
+    """
+    def __init__(self, app: ASGIApp, minimum_size: int = COMPRESSION_MINIMUM_SIZE, exclude: list[str] | None = None) -> None:
+        self.app = app
+        self.minimum_size = minimum_size
+        self.exclude = [re.compile(path) for path in exclude or []]
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or any(path.match(scope["path"]) for path in self.exclude):
+            await self.app(scope, receive, send)
+            return
+
+        encoding = negotiate_encoding(Headers(scope=scope).get("accept-encoding", ""))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        responder = CompressionResponder(send, encoding, self.minimum_size)
+        await self.app(scope, receive, responder.send)
+
+
+class CompressionResponder:
+    def __init__(self, send: Send, encoding: str, minimum_size: int) -> None:
+        self.next_send = send
+        self.encoding = encoding
+        self.minimum_size = minimum_size
+        self.start_message: Message | None = None
+        self.compressor = None
+        self.passthrough = False
+
+    async def send(self, message: Message) -> None:
+        if message["type"] == "http.response.start":
+            # start is sent together with the first chunk, when it's known whether response will be compressed.
+            self.start_message = message
+            return
+        if message["type"] != "http.response.body" or self.passthrough:
+            await self.next_send(message)
+            return
+
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+
+        if self.start_message is not None:
+            start_message, self.start_message = self.start_message, None
+            headers = MutableHeaders(raw=start_message["headers"])
+            if "content-encoding" in headers or (not more_body and len(body) < self.minimum_size):
+                self.passthrough = True
+                await self.next_send(start_message)
+                await self.next_send(message)
+                return
+
+            self.compressor = COMPRESSORS[self.encoding]()
+            headers["Content-Encoding"] = self.encoding
+            headers.add_vary_header("Accept-Encoding")
+            if more_body:
+                del headers["Content-Length"]
+            else:
+                body = self.compressor.finish(body)
+                headers["Content-Length"] = str(len(body))
+                await self.next_send(start_message)
+                await self.next_send({"type": "http.response.body", "body": body})
+                return
+            await self.next_send(start_message)
+
+        body = self.compressor.compress(body) if more_body else self.compressor.finish(body)
+        await self.next_send({"type": "http.response.body", "body": body, "more_body": more_body})
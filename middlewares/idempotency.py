@@ -0,0 +1,210 @@
+import datetime as dt
+import hashlib
+import json
+import os
+import re
+
+from sqlalchemy import and_, or_
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncResult
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from db import models
+from db.database import async_session
+
+IDEMPOTENCY_KEY_TTL = int(os.environ.get("IDEMPOTENCY_KEY_TTL", 86400))
+IDEMPOTENCY_LEASE = int(os.environ.get("IDEMPOTENCY_LEASE", 60))
+IDEMPOTENCY_KEY_MAX_LENGTH = 255
+
+async def purge_idempotency_keys() -> None:
+    """
+    Function to delete stored responses which are older than IDEMPOTENCY_KEY_TTL. Used as a periodic job.
+    """
+    cutoff = dt.datetime.utcnow() - dt.timedelta(seconds=IDEMPOTENCY_KEY_TTL)
+    async with async_session() as session:
+        await session.execute(models.idempotency_key.delete().where(models.idempotency_key.c.created_at < cutoff))
+        await session.commit()
+
+
+class IdempotencyMiddleware:
+    """
+    Middleware which stores the first response of a request with Idempotency-Key header and replays it for retries
+    of the same request, so retried requests don't reach endpoints. A retry which comes while the first request
+    is still processed gets 409 response, after IDEMPOTENCY_LEASE the retry is processed instead of it.
+    Args:
+        app: ASGI application.
+        routes: pairs of HTTP method and regular expression of path of idempotent endpoints.
+    """
+    def __init__(self, app: ASGIApp, routes: list[tuple[str, str]]) -> None:
+        self.app = app
+        self.routes = [(method, re.compile(path)) for method, path in routes]
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or not self._is_idempotent(scope["method"], scope["path"]):
+            await self.app(scope, receive, send)
+            return
+
+        headers = dict(scope["headers"])
+        client_key = headers.get(b"idempotency-key")
+        if client_key is None:
+            await self.app(scope, receive, send)
+            return
+        if len(client_key) > IDEMPOTENCY_KEY_MAX_LENGTH:
+            await self._respond(send, 400, {"detail": "Idempotency-Key is too long."})
+            return
+
+        # keys of different users or endpoints never collide.
+        key = hashlib.sha256(
+            b"\n".join([headers.get(b"authorization", b""), scope["method"].encode(), scope["path"].encode(), client_key])
+        ).hexdigest()
+        body = await self._read_body(receive)
+        fingerprint = hashlib.sha256(body).hexdigest()
+
+        locked_at = dt.datetime.utcnow()
+        stored = await self._acquire(key, fingerprint, locked_at)
+        if stored is not None:
+            if stored.fingerprint != fingerprint:
+                await self._respond(send, 422, {"detail": "Idempotency-Key was already used with other request body."})
+            elif stored.status_code is None:
+                await self._respond(send, 409, {"detail": "Request with this Idempotency-Key is being processed."})
+            else:
+                await self._respond(send, stored.status_code, stored.body.encode(), stored.content_type, replayed=True)
+            return
+
+        response: dict = {"status": None, "content_type": "application/json", "body": b""}
+
+        async def receive_body() -> Message:
+            return {"type": "http.request", "body": body, "more_body": False}
+
+        async def send_and_record(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                response["status"] = message["status"]
+                response["content_type"] = dict(message.get("headers", [])).get(b"content-type", b"").decode()
+            elif message["type"] == "http.response.body":
+                response["body"] += message.get("body", b"")
+            await send(message)
+
+        try:
+            await self.app(scope, receive_body, send_and_record)
+        except BaseException:
+            # cancelled requests are released too, otherwise retries get 409 until the lease expires.
+            await self._release(key, locked_at)
+            raise
+
+        # server errors aren't stored, so the request can be retried.
+        if response["status"] is None or response["status"] >= 500:
+            await self._release(key, locked_at)
+        else:
+            await self._store(key, locked_at, response)
+
+    def _is_idempotent(self, method: str, path: str) -> bool:
+        return any(method == route_method and route_path.match(path) for route_method, route_path in self.routes)
+
+    @staticmethod
+    async def _read_body(receive: Receive) -> bytes:
+        body = b""
+        more_body = True
+        while more_body:
+            message = await receive()
+            body += message.get("body", b"")
+            more_body = message.get("more_body", False)
+        return body
+
+    @staticmethod
+    async def _acquire(key: str, fingerprint: str, locked_at: dt.datetime):
+        """
+        Inserts a row without response for a new key. Unique key makes concurrent requests with the same key fail here.
+        locked_at marks the row as owned by this request, only the owner stores or releases it.
+        Returns None if the key is acquired by this request, otherwise the stored row.
+        """
+        async with async_session() as session:
+            while True:
+                try:
+                    await session.execute(
+                        models.idempotency_key.insert().values(
+                            key=key, fingerprint=fingerprint, created_at=locked_at, locked_at=locked_at
+                        )
+                    )
+                    await session.commit()
+                    return None
+                except IntegrityError:
+                    await session.rollback()
+
+                # expired row which wasn't purged yet and row of a request which didn't finish in its lease are taken over.
+                now = dt.datetime.utcnow()
+                query_renew = models.idempotency_key.update().where(
+                    models.idempotency_key.c.key == key,
+                    or_(
+                        models.idempotency_key.c.created_at < now - dt.timedelta(seconds=IDEMPOTENCY_KEY_TTL),
+                        and_(
+                            models.idempotency_key.c.status_code.is_(None),
+                            or_(
+                                models.idempotency_key.c.locked_at.is_(None),
+                                models.idempotency_key.c.locked_at < now - dt.timedelta(seconds=IDEMPOTENCY_LEASE)
+                            )
+                        )
+                    )
+                ).values(
+                    fingerprint=fingerprint,
+                    created_at=locked_at,
+                    locked_at=locked_at,
+                    status_code=None,
+                    content_type=None,
+                    body=None
+                )
+                result_renew: AsyncResult = await session.execute(query_renew)
+                await session.commit()
+                if result_renew.rowcount:
+                    return None
+
+                result: AsyncResult = await session.execute(
+                    models.idempotency_key.select().where(models.idempotency_key.c.key == key)
+                )
+                stored = result.one_or_none()
+                await session.commit()
+                if stored is not None:
+                    return stored
+                # the row was purged or released after the insert failed, so the key is tried to be acquired again.
+
+    @staticmethod
+    async def _store(key: str, locked_at: dt.datetime, response: dict) -> None:
+        # a request whose row was taken over after its lease doesn't overwrite the row of the retry.
+        async with async_session() as session:
+            await session.execute(
+                models.idempotency_key.update().where(
+                    models.idempotency_key.c.key == key,
+                    models.idempotency_key.c.locked_at == locked_at
+                ).values(
+                    status_code=response["status"],
+                    content_type=response["content_type"],
+                    body=response["body"].decode()
+                )
+            )
+            await session.commit()
+
+    @staticmethod
+    async def _release(key: str, locked_at: dt.datetime) -> None:
+        async with async_session() as session:
+            await session.execute(
+                models.idempotency_key.delete().where(
+                    models.idempotency_key.c.key == key,
+                    models.idempotency_key.c.locked_at == locked_at
+                )
+            )
+            await session.commit()
+
+    @staticmethod
+    async def _respond(
+        send: Send,
+        status_code: int,
+        body: dict | bytes,
+        content_type: str = "application/json",
+        replayed: bool = False
+    ) -> None:
+        if isinstance(body, dict):
+            body = json.dumps(body).encode()
+        headers = [(b"content-type", content_type.encode()), (b"content-length", str(len(body)).encode())]
+        if replayed:
+            headers.append((b"idempotent-replayed", b"true"))
+        await send({"type": "http.response.start", "status": status_code, "headers": headers})
+        await send({"type": "http.response.body", "body": body})
@@ -0,0 +1,165 @@
+from collections import OrderedDict
+import contextvars
+import cProfile
+import hmac
+import io
+import os
+import pstats
+import random
+import re
+import time
+import uuid
+
+from fastapi import APIRouter, Header, HTTPException, status
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+PROFILING_TOKEN = os.environ.get("PROFILING_TOKEN")
+PROFILING_SAMPLE_RATE = float(os.environ.get("PROFILING_SAMPLE_RATE", 0))
+PROFILING_MAX_RESULTS = int(os.environ.get("PROFILING_MAX_RESULTS", 50))
+PROFILING_MAX_FUNCTIONS = 40
+
+# results of profiled requests, the oldest ones are dropped.
+profiles: OrderedDict[str, dict] = OrderedDict()
+# SQL statements of currently profiled request, None when request isn't profiled.
+current_statements: contextvars.ContextVar[list | None] = contextvars.ContextVar("current_statements", default=None)
+
+profiling_router = APIRouter()
+
+# listeners are added to Engine class because the engine is created lazily. Statements are recorded only in profiled requests.
+@event.listens_for(Engine, "before_cursor_execute")
+def before_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+    if current_statements.get() is not None:
+        conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+@event.listens_for(Engine, "after_cursor_execute")
+def after_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+    statements = current_statements.get()
+    if statements is not None:
+        # parameters aren't stored because they may contain passwords.
+        duration = time.perf_counter() - conn.info["query_start"].pop()
+        statements.append({"statement": statement, "duration_ms": round(duration * 1000, 3)})
+
+def is_admin(token: str | None) -> bool:
+    return bool(PROFILING_TOKEN and token and hmac.compare_digest(token, PROFILING_TOKEN))
+
+
+class ProfilingMiddleware:
+    """
+    Middleware which profiles requests with X-Profile header equal to PROFILING_TOKEN
+    and a random share of other requests set by PROFILING_SAMPLE_RATE.
+    Id of a profile is returned in X-Profile-Id header, profile itself is available at /api/v1/profiling/{profile_id}.
+    cProfile records every function called in the event loop thread, so statistics of a profile include requests
+    and periodic jobs which ran meanwhile, amount of such requests is stored with it. Other requests aren't stopped.
+    cProfile can profile only one request at a time, requests which come meanwhile aren't profiled.
+    Args:
+        app: ASGI application.
+        exclude: regular expressions of paths which are never profiled.
+    """
+    def __init__(self, app: ASGIApp, exclude: list[str] | None = None) -> None:
+        self.app = app
+        self.exclude = [re.compile(path) for path in exclude or []]
+        self.enabled = bool(PROFILING_TOKEN) or PROFILING_SAMPLE_RATE > 0
+        self.profiler: cProfile.Profile | None = None
+        self.running = 0 # requests which are being processed.
+        self.started = 0 # requests which were started, to count requests which overlap a profiled one.
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if not self.enabled or scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        self.running += 1
+        self.started += 1
+        try:
+            if (
+                self.profiler is not None
+                or any(path.match(scope["path"]) for path in self.exclude)
+                or not self._should_profile(scope)
+            ):
+                await self.app(scope, receive, send)
+            else:
+                await self._profile(scope, receive, send)
+        finally:
+            self.running -= 1
+
+    async def _profile(self, scope: Scope, receive: Receive, send: Send) -> None:
+        profile_id = uuid.uuid4().hex
+        response = {"status": None}
+
+        async def send_with_id(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                response["status"] = message["status"]
+                message["headers"] = list(message.get("headers", [])) + [(b"x-profile-id", profile_id.encode())]
+            await send(message)
+
+        statements = []
+        token = current_statements.set(statements)
+        self.profiler = cProfile.Profile()
+        # requests which are running already or start before the end of this one get to the profile too.
+        concurrent = self.running - 1 - self.started
+        start = time.perf_counter()
+        self.profiler.enable()
+        try:
+            await self.app(scope, receive, send_with_id)
+        finally:
+            self.profiler.disable()
+            duration = time.perf_counter() - start
+            profiler, self.profiler = self.profiler, None
+            concurrent += self.started
+            current_statements.reset(token)
+
+            stats = io.StringIO()
+            pstats.Stats(profiler, stream=stats).sort_stats("cumulative").print_stats(PROFILING_MAX_FUNCTIONS)
+            profiles[profile_id] = {
+                "id": profile_id,
+                "method": scope["method"],
+                "path": scope["path"],
+                "status_code": response["status"],
+                "duration_ms": round(duration * 1000, 3),
+                "sql_duration_ms": round(sum(item["duration_ms"] for item in statements), 3),
+                "statements": statements,
+                "concurrent_requests": concurrent,
+                "stats_scope": "event loop: this request, concurrent requests and periodic jobs which ran meanwhile",
+                "stats": stats.getvalue(),
+            }
+            while len(profiles) > PROFILING_MAX_RESULTS:
+                profiles.popitem(last=False)
+
+    @staticmethod
+    def _should_profile(scope: Scope) -> bool:
+        for name, value in scope["headers"]:
+            if name == b"x-profile":
+                return is_admin(value.decode())
+        return PROFILING_SAMPLE_RATE > 0 and random.random() < PROFILING_SAMPLE_RATE
+
+
+@profiling_router.get("", status_code=status.HTTP_200_OK)
+async def get_profiles(x_profile: str | None = Header(None)):
+    """
+    Request to get short info about stored profiles. Requires X-Profile header with PROFILING_TOKEN.
+    Returns:
+        List of JSONs with id, path, status code and durations of profiled requests.
+    """
+    if not is_admin(x_profile):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Not allowed.")
+    return [
+        {key: value for key, value in profile.items() if key not in ("statements", "stats_scope", "stats")}
+        for profile in reversed(profiles.values())
+    ]
+
+@profiling_router.get("/{profile_id}", status_code=status.HTTP_200_OK)
+async def get_profile(profile_id: str, x_profile: str | None = Header(None)):
+    """
+    Request to get a profile of a request. Requires X-Profile header with PROFILING_TOKEN.
+    Args:
+        profile_id: id from X-Profile-Id header of profiled response.
+    Returns:
+        JSON with SQL statements with their durations and cProfile statistics sorted by cumulative time.
+    """
+    if not is_admin(x_profile):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Not allowed.")
+    if profile_id not in profiles:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Profile not found.")
+    return profiles[profile_id]
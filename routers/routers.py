@@ -1,5 +1,8 @@
 from fastapi import APIRouter
 
+from batch.services import batch_router
+from middlewares.profiling import profiling_router
+from sync.services import sync_router
 from tasks.services import task_router
 from todolists.services import todolist_router
 from users.services import user_router
@@ -8,3 +11,6 @@ api_router = APIRouter(prefix="/api/v1")
 api_router.include_router(user_router, prefix="/users")
 api_router.include_router(todolist_router, prefix="/lists")
 api_router.include_router(task_router, prefix="/tasks")
+api_router.include_router(batch_router, prefix="/batch")
+api_router.include_router(sync_router, prefix="/sync")
+api_router.include_router(profiling_router, prefix="/profiling")
@@ -0,0 +1,12 @@
+from pydantic import BaseModel
+
+from db import schemas
+
+
+class SyncResult(BaseModel):
+    revision: int # revision of returned data, sent as since parameter on the next sync.
+    full: bool # True if returned data replaces all data of a client, e.g. on the first sync.
+    lists: list[schemas.ListSummary]
+    tasks: list[schemas.SyncTask]
+    deleted_lists: list[int]
+    deleted_tasks: list[int] # tasks of deleted lists aren't listed, they're deleted together with their list.
@@ -0,0 +1,83 @@
+from fastapi import APIRouter, Depends, Query, status
+import sqlalchemy
+from sqlalchemy.ext.asyncio import AsyncSession, AsyncResult
+
+from db import models, queries
+from users.models import Session
+from users.services import oauth2_scheme
+from users.utils.get_current_user import is_user_activated
+from users.utils.get_user_session import get_user_session
+
+from .models import SyncResult
+
+sync_router = APIRouter()
+
+@sync_router.get("", response_model=SyncResult, status_code=status.HTTP_200_OK)
+async def sync(
+    since: int = Query(0, ge=0),
+    token: str = Depends(oauth2_scheme),
+    session: AsyncSession = Depends(get_user_session)
+):
+    """
+    Function to get lists and tasks of current authenticated user which were changed after a revision.
+    Args:
+        since: revision returned by the previous sync, 0 to get all data.
+        token: token of currently logged in user.
+        session: instance of current session with database.
+    Returns:
+        JSON with current revision, changed lists and tasks and ids of deleted ones.
+    """
+    user = await is_user_activated(token=token, session=Session(session=session))
+
+    result_revision: AsyncResult = await session.execute(queries.user_revision, {"user_id": user.id})
+    revision, pruned_revision = result_revision.one_or_none() or (0, 0)
+    # client's revision is unknown if its changes were pruned or it's newer than the current one (e.g. after restore).
+    full = since == 0 or since < pruned_revision or since > revision
+
+    query_lists = queries.lists_summary
+    query_tasks = sqlalchemy.select(
+        models.task,
+        models.task_list.c.list_id,
+        models.task_list.c.position
+    ).join(
+        models.task_list, models.task.c.id == models.task_list.c.task_id
+    ).where(models.task.c.user_id == user.id).order_by(models.task_list.c.list_id, models.task_list.c.position)
+    deleted = {"list": set(), "task": set()}
+    if not full:
+        # changes after the read revision will be returned by the next sync.
+        query_changes = sqlalchemy.select(
+            models.change_log.c.entity,
+            models.change_log.c.entity_id,
+            models.change_log.c.deleted
+        ).where(
+            models.change_log.c.user_id == user.id,
+            models.change_log.c.revision > since,
+            models.change_log.c.revision <= revision
+        ).order_by(models.change_log.c.revision, models.change_log.c.id)
+        result_changes: AsyncResult = await session.execute(query_changes)
+        changed = {"list": set(), "task": set()}
+        for item in result_changes.all(): # only the latest change of every list and task matters.
+            (deleted if item.deleted else changed)[item.entity].add(item.entity_id)
+            (changed if item.deleted else deleted)[item.entity].discard(item.entity_id)
+
+        query_lists = query_lists.where(models.todolist.c.id.in_(changed["list"]))
+        query_tasks = query_tasks.where(models.task.c.id.in_(changed["task"]))
+
+    result_lists: AsyncResult = await session.execute(query_lists, {"user_id": user.id})
+    lists = result_lists.all()
+    result_tasks: AsyncResult = await session.execute(query_tasks)
+    tasks = result_tasks.all()
+    if not full:
+        # data deleted after the revision was read is returned as deleted, its tombstone is returned by the next sync too.
+        deleted["list"].update(changed["list"].difference(item.id for item in lists))
+        deleted["task"].update(changed["task"].difference(item.id for item in tasks))
+
+    resp = SyncResult(
+        revision=revision,
+        full=full,
+        lists=[item._asdict() for item in lists],
+        tasks=[item._asdict() for item in tasks],
+        deleted_lists=sorted(deleted["list"]),
+        deleted_tasks=sorted(deleted["task"])
+    )
+    return resp
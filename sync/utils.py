@@ -0,0 +1,98 @@
+from collections.abc import Iterable
+import datetime as dt
+import logging
+import os
+
+import sqlalchemy
+from sqlalchemy.ext.asyncio import AsyncSession, AsyncResult
+
+from db import models, queries
+from db.database import data_shards, shard_session
+
+logger = logging.getLogger(__name__)
+
+SYNC_LOG_RETENTION_DAYS = int(os.environ.get("SYNC_LOG_RETENTION_DAYS", 30))
+SYNC_PRUNE_BATCH_SIZE = int(os.environ.get("SYNC_PRUNE_BATCH_SIZE", 1000))
+
+async def record_changes(
+    session: AsyncSession,
+    user_id: int,
+    lists: Iterable[int] = (),
+    tasks: Iterable[int] = (),
+    deleted_lists: Iterable[int] = (),
+    deleted_tasks: Iterable[int] = ()
+) -> int:
+    """
+    Function to write changed lists and tasks of a user to change log under the next revision of the user.
+    Doesn't commit, so changes are logged in the same transaction as they are made.
+    Args:
+        session: instance of current session with database.
+        user_id: id of an owner of changed data.
+        lists: ids of created or changed lists.
+        tasks: ids of created or changed tasks.
+        deleted_lists: ids of deleted lists. Their tasks don't need to be listed.
+        deleted_tasks: ids of deleted or archived tasks.
+    Returns:
+        New revision of user's data.
+    """
+    dialect = session.bind.dialect.name
+    result: AsyncResult = await session.execute(queries.bump_revision[dialect], {"owner_id": user_id})
+    if dialect != "postgresql":
+        result = await session.execute(queries.user_revision, {"user_id": user_id})
+    revision = result.scalar_one()
+
+    changed_at = dt.datetime.utcnow()
+    entries = [
+        {"entity": entity, "entity_id": entity_id, "deleted": deleted}
+        for entity, ids, deleted in (
+            ("list", lists, False),
+            ("task", tasks, False),
+            ("list", deleted_lists, True),
+            ("task", deleted_tasks, True)
+        ) for entity_id in ids
+    ]
+    if entries:
+        await session.execute(
+            models.change_log.insert(),
+            [{**entry, "user_id": user_id, "revision": revision, "changed_at": changed_at} for entry in entries]
+        )
+    return revision
+
+async def prune_change_log() -> None:
+    """
+    Function to delete changes older than SYNC_LOG_RETENTION_DAYS from change log. Used as a periodic job.
+    Users are processed in batches, each batch in its own transaction to keep locks short.
+    Clients which haven't synced since pruned revisions get all their data on the next sync.
+    """
+    cutoff = dt.datetime.utcnow() - dt.timedelta(days=SYNC_LOG_RETENTION_DAYS)
+    query_revisions = sqlalchemy.select(
+        models.change_log.c.user_id,
+        sqlalchemy.func.max(models.change_log.c.revision).label("revision")
+    ).where(models.change_log.c.changed_at < cutoff).group_by(models.change_log.c.user_id)
+
+    pruned = 0
+    for shard in data_shards():
+        async with shard_session(shard) as session:
+            result: AsyncResult = await session.execute(query_revisions)
+            revisions = result.all()
+
+            query_update = models.sync_revision.update().where(
+                models.sync_revision.c.user_id == sqlalchemy.bindparam("owner_id"),
+                models.sync_revision.c.pruned_revision < sqlalchemy.bindparam("last_revision")
+            ).values(pruned_revision=sqlalchemy.bindparam("last_revision"))
+            for start in range(0, len(revisions), SYNC_PRUNE_BATCH_SIZE):
+                batch = revisions[start:start + SYNC_PRUNE_BATCH_SIZE]
+                # pruned revision is saved in the same transaction, so clients never miss deleted changes.
+                await session.execute(
+                    query_update,
+                    [{"owner_id": item.user_id, "last_revision": item.revision} for item in batch]
+                )
+                result_delete: AsyncResult = await session.execute(models.change_log.delete().where(
+                    models.change_log.c.user_id.in_([item.user_id for item in batch]),
+                    models.change_log.c.changed_at < cutoff
+                ))
+                await session.commit()
+                pruned += result_delete.rowcount
+
+    if pruned:
+        logger.info("%d changes were pruned from change log.", pruned)
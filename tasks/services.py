@@ -1,22 +1,99 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+import datetime as dt
 
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Query, status
+
+import sqlalchemy
 from sqlalchemy.ext.asyncio import AsyncSession, AsyncResult
 
-from db import models, schemas
-from db.database import get_session, session_commit
+from cache.utils import invalidate_on_commit, list_tags
+from db import models, queries, schemas
+from db.database import session_commit
+from sync.utils import record_changes
 
 from todolists.services import retrieve_list
+from todolists.utils import get_task_list_id, update_counters
 
+from users.models import Session
 from users.services import oauth2_scheme
+from users.utils.get_current_user import is_user_activated
+from users.utils.get_user_session import get_user_session
+
+from .utils import TASK_POSITION_MAX_LENGTH, get_last_position, owned_task, rank_between, rebalance_list
 
 task_router = APIRouter()
 
+task_not_found_exception = HTTPException(
+    status_code=status.HTTP_404_NOT_FOUND,
+    detail="Task not found."
+)
+
+@task_router.get("/upcoming", response_model=list[schemas.UpcomingTask], status_code=status.HTTP_200_OK)
+async def get_upcoming_tasks(
+    start: dt.time = dt.time.min,
+    end: dt.time = dt.time.max,
+    limit: int = Query(50, ge=1, le=200),
+    offset: int = Query(0, ge=0),
+    token: str = Depends(oauth2_scheme),
+    session: AsyncSession = Depends(get_user_session),
+):
+    """
+    Function to get not completed tasks from all lists of current authenticated user ordered by time.
+    Args:
+        start: the earliest time of returned tasks.
+        end: the latest time of returned tasks.
+        limit: maximum amount of returned tasks.
+        offset: amount of tasks to skip.
+        token: token of currently logged in user.
+        session: instance of current session with database.
+    Returns:
+        List of JSONs with task data and id of its list.
+    """
+    user = await is_user_activated(token=token, session=Session(session=session))
+
+    # done condition is the same as in ix_task_pending_time, so the partial index can be used.
+    query_upcoming = sqlalchemy.select(models.task, models.task_list.c.list_id).join(
+        models.task_list, models.task.c.id == models.task_list.c.task_id
+    ).where(
+        models.task.c.user_id == user.id,
+        models.task.c.done.is_(sqlalchemy.false()),
+        models.task.c.time.between(start, end)
+    ).order_by(models.task.c.time, models.task.c.id).limit(limit).offset(offset)
+    result: AsyncResult = await session.execute(query_upcoming)
+    resp = [schemas.UpcomingTask(**item._asdict()) for item in result.all()]
+    return resp
+
+@task_router.get("/archived", response_model=list[schemas.ArchivedTask], status_code=status.HTTP_200_OK)
+async def get_archived_tasks(
+    limit: int = Query(50, ge=1, le=200),
+    offset: int = Query(0, ge=0),
+    token: str = Depends(oauth2_scheme),
+    session: AsyncSession = Depends(get_user_session),
+):
+    """
+    Function to get archived tasks of current authenticated user, recently completed first.
+    Args:
+        limit: maximum amount of returned tasks.
+        offset: amount of tasks to skip.
+        token: token of currently logged in user.
+        session: instance of current session with database.
+    Returns:
+        List of JSONs with archived task data.
+    """
+    user = await is_user_activated(token=token, session=Session(session=session))
+
+    query_archived = models.task_archive.select().where(
+        models.task_archive.c.user_id == user.id
+    ).order_by(models.task_archive.c.completed_at.desc()).limit(limit).offset(offset)
+    result: AsyncResult = await session.execute(query_archived)
+    resp = [schemas.ArchivedTask(**item._asdict()) for item in result.all()]
+    return resp
+
 @task_router.post("/{list_id}/create", response_model=schemas.Task, status_code=status.HTTP_201_CREATED)
 async def create_task(
     list_id: int,
     task: schemas.TaskCreate,
     token: str = Depends(oauth2_scheme),
-    session: AsyncSession = Depends(get_session),
+    session: AsyncSession = Depends(get_user_session),
 ):
     """
     Function to create new task.
@@ -29,36 +106,34 @@ async def create_task(
         JSON with created task data.
     """
     # retrieve a list to which task will be added with verification whether a list belongs to currently authenticated user.
-    list_item = await retrieve_list(list_id, token, session)
+    list_item = await retrieve_list(list_id, token, session, fields="id,user_id")
 
     task_data = {
         "task": task.task,
         "time": task.time,
         "description": task.description,
-        "done": task.done,
+        "done": False,
+        "user_id": list_item.user_id
     }
 
     query_task_create = models.task.insert().values(**task_data)
     result: AsyncResult = await session.execute(query_task_create)
-    await session_commit(
-        Exception,
-        HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Something went wrong.",
-            headers={"WWW-Authenticate": "Bearer"}
-        ),
-        session
-    )
     last_record_id: int = result.inserted_primary_key[0] # creates new record and returns its id.
     
-    # values and query for intermediate table to provide MtM relation.
+    # values and query for intermediate table to provide MtM relation. New task is placed to the end of a list.
     task_list_data = {
         "list_id": list_item.id,
-        "task_id": last_record_id
+        "task_id": last_record_id,
+        "user_id": list_item.user_id,
+        "position": rank_between(await get_last_position(list_item.id, session), None)
     }
 
     query_task_list_create = models.task_list.insert().values(**task_list_data)
     await session.execute(query_task_list_create)
+    await update_counters(list_item.id, session, task_count=1)
+    await record_changes(session, list_item.user_id, lists=[list_item.id], tasks=[last_record_id])
+    invalidate_on_commit(session, *list_tags(list_item.id, list_item.user_id))
+    # task, its link to a list and counters are committed together.
     await session_commit(
         Exception,
         HTTPException(
@@ -74,24 +149,105 @@ async def create_task(
 
 # TODO: Implement dropdown list for existing tasks.
 
+@task_router.patch("/{task_id}/move", response_model=schemas.Task, status_code=status.HTTP_200_OK)
+async def move_task(
+    task_id: int,
+    move: schemas.TaskMove,
+    backgroundtasks: BackgroundTasks,
+    token: str = Depends(oauth2_scheme),
+    session: AsyncSession = Depends(get_user_session),
+):
+    """
+    Function to change position of a task in its list. Only one row is updated.
+    Args:
+        task_id: id of a task which will be moved.
+        move: form with id of a task after which moved task will be placed.
+        backgroundtasks: instance of BackgroundTasks class for ranks rebalancing.
+        token: token of currently logged in user.
+        session: instance of current session with database.
+    Returns:
+        JSON with moved task data.
+    """
+    user = await is_user_activated(token=token, session=Session(session=session))
+
+    query_list_id = sqlalchemy.select(models.task_list.c.list_id).join(
+        models.task, models.task.c.id == models.task_list.c.task_id
+    ).where(owned_task(task_id, user.id))
+    result_list_id: AsyncResult = await session.execute(query_list_id)
+    list_id = result_list_id.scalar()
+    if list_id is None:
+        raise task_not_found_exception
+
+    other_tasks = (models.task_list.c.list_id == list_id) & (models.task_list.c.task_id != task_id)
+    before = None
+    if move.after_id is not None:
+        query_before = sqlalchemy.select(models.task_list.c.position).where(
+            other_tasks, models.task_list.c.task_id == move.after_id
+        )
+        result_before: AsyncResult = await session.execute(query_before)
+        before = result_before.scalar()
+        if before is None:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="There is no such task in this list."
+            )
+
+    query_after = sqlalchemy.select(sqlalchemy.func.min(models.task_list.c.position)).where(other_tasks)
+    if before is not None:
+        query_after = query_after.where(models.task_list.c.position > before)
+    result_after: AsyncResult = await session.execute(query_after)
+    after = result_after.scalar()
+
+    position = rank_between(before, after)
+    query_move = models.task_list.update().where(models.task_list.c.task_id == task_id).values(position=position)
+    await session.execute(query_move)
+    await record_changes(session, user.id, tasks=[task_id])
+    invalidate_on_commit(session, *list_tags(list_id, user.id))
+    await session_commit(
+        Exception,
+        HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Something went wrong.",
+            headers={"WWW-Authenticate": "Bearer"}
+        ),
+        session
+    )
+
+    if len(position) > TASK_POSITION_MAX_LENGTH:
+        backgroundtasks.add_task(rebalance_list, list_id, session.info.get("shard"))
+
+    result: AsyncResult = await session.execute(queries.task_by_owner, {"task_id": task_id, "user_id": user.id})
+    moved_task = result.one()
+    resp = schemas.Task(**moved_task._asdict())
+    return resp
+
 @task_router.patch("/{task_id}/complete", response_model=schemas.Task, status_code=status.HTTP_201_CREATED)
 async def complete_task(
     task_id: int,
-    _: str = Depends(oauth2_scheme),
-    session: AsyncSession = Depends(get_session),
+    token: str = Depends(oauth2_scheme),
+    session: AsyncSession = Depends(get_user_session),
 ):
     """
     Function to mark task as completed.
     Args:
         task_id: id of a task which we've completed.
-        _: token of currently logged in user.
+        token: token of currently logged in user.
         session: instance of current session with database.
     Returns:
         JSON with created task data.
     """
+    user = await is_user_activated(token=token, session=Session(session=session))
 
-    query_complete = models.task.update().where(models.task.c.id == task_id).values(done=True)
-    await session.execute(query_complete)
+    # already completed tasks are not updated so done_count is increased only once.
+    query_complete = models.task.update().where(
+        owned_task(task_id, user.id), models.task.c.done.isnot(sqlalchemy.true())
+    ).values(done=True, completed_at=dt.datetime.utcnow())
+    result_complete: AsyncResult = await session.execute(query_complete)
+    if result_complete.rowcount:
+        list_id = await get_task_list_id(task_id, session)
+        await update_counters(list_id, session, done_count=1)
+        await record_changes(session, user.id, lists=[list_id], tasks=[task_id])
+        invalidate_on_commit(session, *list_tags(list_id, user.id))
     await session_commit(
         Exception,
         HTTPException(
@@ -102,27 +258,40 @@ async def complete_task(
         session
     )
 
-    query_select = models.task.select().where(models.task.c.id == task_id)
-    result: AsyncResult = await session.execute(query_select)
-    completed_task = result.one()
+    result: AsyncResult = await session.execute(queries.task_by_owner, {"task_id": task_id, "user_id": user.id})
+    completed_task = result.one_or_none()
+    if not completed_task:
+        raise task_not_found_exception
     resp = schemas.Task(**completed_task._asdict())
     return resp
 
 @task_router.delete("/{task_id}/delete", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_task(
     task_id: int,
-    _: str = Depends(oauth2_scheme),
-    session: AsyncSession = Depends(get_session)
+    token: str = Depends(oauth2_scheme),
+    session: AsyncSession = Depends(get_user_session)
 ):
     """
     Function to delete a task.
     Args:
         task_id: id of a task which we've completed.
-        _: token of currently logged in user.
+        token: token of currently logged in user.
         session: instance of current session with database.
     """
-    query_delete = models.task.delete().where(models.task.c.id == task_id)
+    user = await is_user_activated(token=token, session=Session(session=session))
+
+    result: AsyncResult = await session.execute(queries.task_state_by_owner, {"task_id": task_id, "user_id": user.id})
+    deleted_task = result.one_or_none()
+    if not deleted_task:
+        raise task_not_found_exception
+
+    query_delete_link = models.task_list.delete().where(models.task_list.c.task_id == task_id)
+    await session.execute(query_delete_link)
+    query_delete = models.task.delete().where(owned_task(task_id, user.id))
     await session.execute(query_delete)
+    await update_counters(deleted_task.list_id, session, task_count=-1, done_count=-1 if deleted_task.done else 0)
+    await record_changes(session, user.id, lists=[deleted_task.list_id], deleted_tasks=[task_id])
+    invalidate_on_commit(session, *list_tags(deleted_task.list_id, user.id))
     await session_commit(
         Exception,
         HTTPException(
@@ -137,27 +306,32 @@ async def delete_task(
 async def edit_task(
     task_id: int,
     new_task: schemas.TaskCreate,
-    _: str = Depends(oauth2_scheme),
-    session: AsyncSession = Depends(get_session)
+    token: str = Depends(oauth2_scheme),
+    session: AsyncSession = Depends(get_user_session)
 ):
     """
     Function to edit task.
     Args:
         task_id: id of a task which we've completed.
         new_task: form with edited task data.
-        _: token of currently logged in user.
+        token: token of currently logged in user.
         session: instance of current session with database.
     Returns:
         JSON with created task data.
     """
+    user = await is_user_activated(token=token, session=Session(session=session))
+
     task_data = {
         "task": new_task.task,
         "time": new_task.time,
         "description": new_task.description
     }
 
-    query_update = models.task.update().where(models.task.c.id == task_id).values(**task_data)
-    await session.execute(query_update)
+    query_update = models.task.update().where(owned_task(task_id, user.id)).values(**task_data)
+    result_update: AsyncResult = await session.execute(query_update)
+    if result_update.rowcount:
+        await record_changes(session, user.id, tasks=[task_id])
+        invalidate_on_commit(session, *list_tags(await get_task_list_id(task_id, session), user.id))
     await session_commit(
         Exception,
         HTTPException(
@@ -168,8 +342,9 @@ async def edit_task(
         session
     )
 
-    query_resp = models.task.select().where(models.task.c.id == task_id)
-    result: AsyncResult = await session.execute(query_resp)
-    task = result.one()
+    result: AsyncResult = await session.execute(queries.task_by_owner, {"task_id": task_id, "user_id": user.id})
+    task = result.one_or_none()
+    if not task:
+        raise task_not_found_exception
     resp = schemas.Task(**task._asdict())
     return resp
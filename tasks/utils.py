@@ -0,0 +1,207 @@
+import asyncio
+from collections import Counter
+import datetime as dt
+import logging
+import os
+
+import sqlalchemy
+from sqlalchemy.ext.asyncio import AsyncSession, AsyncResult
+
+from cache.utils import invalidate, list_tags
+from db import models, queries
+from db.database import data_shards, shard_session
+from sync.utils import record_changes
+from todolists.utils import update_counters
+
+logger = logging.getLogger(__name__)
+
+# digits of rank strings in ASCII order, so ranks can be compared as plain strings.
+DIGITS = "0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz"
+BASE = len(DIGITS)
+
+TASK_POSITION_MAX_LENGTH = int(os.environ.get("TASK_POSITION_MAX_LENGTH", 12))
+TASK_ARCHIVE_AGE_DAYS = int(os.environ.get("TASK_ARCHIVE_AGE_DAYS", 30))
+TASK_ARCHIVE_BATCH_SIZE = int(os.environ.get("TASK_ARCHIVE_BATCH_SIZE", 500))
+TASK_ARCHIVE_BATCH_DELAY = float(os.environ.get("TASK_ARCHIVE_BATCH_DELAY", 1))
+
+def owned_task(task_id: int, user_id: int) -> sqlalchemy.sql.ColumnElement:
+    """
+    Function to build a condition which matches a task only if it belongs to a user.
+    Filtering by user_id lets partitioned task table to be scanned in one partition only.
+    Args:
+        task_id: id of a task.
+        user_id: id of an owner.
+    Returns:
+        SQLAlchemy condition for where clause.
+    """
+    return (models.task.c.id == task_id) & (models.task.c.user_id == user_id)
+
+def rank_between(before: str | None, after: str | None) -> str:
+    """
+    Function to generate a rank which lies strictly between two other ranks.
+    Generated ranks never end with the lowest digit, so there is always a room for one more rank before them.
+    Args:
+        before: rank of a previous task or None if there is no such task.
+        after: rank of a next task or None if there is no such task.
+    Returns:
+        String with new rank.
+    """
+    append = after is None # stepping by one instead of halving keeps ranks short when tasks are added to the end.
+    rank = ""
+    i = 0
+    while True:
+        low = DIGITS.index(before[i]) if before and i < len(before) else 0
+        high = DIGITS.index(after[i]) if after and i < len(after) else BASE
+        if high - low > 1:
+            middle = low + 1 if append else (low + high) // 2
+            return rank + DIGITS[middle]
+        rank += DIGITS[low]
+        if high > low: # rank is already less than the upper bound so it doesn't restrict next digits.
+            after = None
+        i += 1
+
+def rank_sequence(count: int) -> list[str]:
+    """
+    Function to generate evenly spaced ranks.
+    Args:
+        count: amount of ranks.
+    Returns:
+        List of ascending ranks.
+    """
+    width = 1
+    while BASE ** width <= count + 1:
+        width += 1
+    width += 1 # one more digit to leave room for moves between neighbours.
+    step = BASE ** width // (count + 1)
+
+    ranks = []
+    for i in range(1, count + 1):
+        value = i * step
+        digits = ""
+        for _ in range(width):
+            value, digit = divmod(value, BASE)
+            digits = DIGITS[digit] + digits
+        ranks.append(digits.rstrip(DIGITS[0]))
+    return ranks
+
+async def get_last_position(list_id: int, session: AsyncSession) -> str | None:
+    """
+    Function to get the highest rank in a list.
+    Args:
+        list_id: id of a list.
+        session: instance of current session with database.
+    Returns:
+        Rank of the last task in a list or None if list is empty.
+    """
+    result: AsyncResult = await session.execute(queries.last_position, {"list_id": list_id})
+    return result.scalar()
+
+async def rebalance_list(list_id: int, shard: int | None = None) -> None:
+    """
+    Function to replace ranks of all tasks in a list with short evenly spaced ones keeping their order.
+    Args:
+        list_id: id of a list.
+        shard: index of a shard with the list, None when sharding is disabled.
+    """
+    async with shard_session(shard) as session:
+        query_select = sqlalchemy.select(models.task_list.c.pk, models.task_list.c.task_id).where(
+            models.task_list.c.list_id == list_id
+        ).order_by(models.task_list.c.position, models.task_list.c.pk)
+        result: AsyncResult = await session.execute(query_select)
+        rows = result.all()
+        if not rows:
+            return
+
+        query_update = models.task_list.update().where(
+            models.task_list.c.pk == sqlalchemy.bindparam("row_pk")
+        ).values(position=sqlalchemy.bindparam("new_position"))
+        await session.execute(
+            query_update,
+            [{"row_pk": item.pk, "new_position": position} for item, position in zip(rows, rank_sequence(len(rows)))]
+        )
+        query_owner = sqlalchemy.select(models.todolist.c.user_id).where(models.todolist.c.id == list_id)
+        result_owner: AsyncResult = await session.execute(query_owner)
+        user_id = result_owner.scalar()
+        # positions of all tasks are changed, so clients have to get all of them to keep the order.
+        await record_changes(session, user_id, tasks=[item.task_id for item in rows])
+        await session.commit()
+        await invalidate(*list_tags(list_id, user_id))
+
+async def rebalance_lists() -> None:
+    """
+    Function to rebalance every list which has too long ranks. Used as a periodic job.
+    """
+    for shard in data_shards():
+        async with shard_session(shard) as session:
+            query = sqlalchemy.select(models.task_list.c.list_id).where(
+                sqlalchemy.func.length(models.task_list.c.position) > TASK_POSITION_MAX_LENGTH
+            ).distinct()
+            result: AsyncResult = await session.execute(query)
+            list_ids = result.scalars().all()
+
+        for list_id in list_ids:
+            await rebalance_list(list_id, shard)
+
+async def archive_tasks() -> None:
+    """
+    Function to move tasks completed long ago from task table to task_archive table. Used as a periodic job.
+    Tasks are moved in small batches with a pause between them, so the job doesn't hold locks for long.
+    """
+    cutoff = dt.datetime.utcnow() - dt.timedelta(days=TASK_ARCHIVE_AGE_DAYS)
+    query_select = sqlalchemy.select(models.task, models.task_list.c.list_id).join(
+        models.task_list, models.task.c.id == models.task_list.c.task_id
+    ).where(
+        models.task.c.done.is_(sqlalchemy.true()),
+        models.task.c.completed_at < cutoff
+    ).order_by(models.task.c.completed_at).limit(TASK_ARCHIVE_BATCH_SIZE).with_for_update(
+        of=models.task, skip_locked=True # tasks which are being changed right now will be archived next time.
+    )
+
+    archived = 0
+    for shard in data_shards():
+        async with shard_session(shard) as session:
+            while True:
+                result: AsyncResult = await session.execute(query_select)
+                tasks = result.all()
+                if not tasks:
+                    break
+
+                archived_at = dt.datetime.utcnow()
+                await session.execute(
+                    models.task_archive.insert(),
+                    [
+                        {
+                            "id": item.id,
+                            "task": item.task,
+                            "time": item.time,
+                            "description": item.description,
+                            "list_id": item.list_id,
+                            "user_id": item.user_id,
+                            "completed_at": item.completed_at,
+                            "archived_at": archived_at
+                        } for item in tasks
+                    ]
+                )
+                ids = [item.id for item in tasks]
+                await session.execute(models.task_list.delete().where(models.task_list.c.task_id.in_(ids)))
+                await session.execute(models.task.delete().where(models.task.c.id.in_(ids)))
+                for list_id, count in Counter(item.list_id for item in tasks).items():
+                    await update_counters(list_id, session, task_count=-count, done_count=-count)
+                # archived tasks are deleted for clients.
+                for user_id in sorted({item.user_id for item in tasks}): # the same order of locks in every worker.
+                    await record_changes(
+                        session,
+                        user_id,
+                        lists={item.list_id for item in tasks if item.user_id == user_id},
+                        deleted_tasks=[item.id for item in tasks if item.user_id == user_id]
+                    )
+                await session.commit()
+                await invalidate(*{tag for item in tasks for tag in list_tags(item.list_id, item.user_id)})
+
+                archived += len(tasks)
+                if len(tasks) < TASK_ARCHIVE_BATCH_SIZE:
+                    break
+                await asyncio.sleep(TASK_ARCHIVE_BATCH_DELAY)
+
+    if archived:
+        logger.info("%d tasks were archived.", archived)
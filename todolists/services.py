@@ -1,13 +1,16 @@
 from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.ext.asyncio import AsyncSession, AsyncResult
 
-from db import models, schemas
-from db.database import get_session, session_commit
+from cache.utils import cached, invalidate_on_commit, list_tags, user_lists_tag
+from db import models, queries, schemas
+from db.database import session_commit
+from sync.utils import record_changes
 from users.services import oauth2_scheme
 from users.models import Session
 from users.utils.get_current_user import is_user_activated
+from users.utils.get_user_session import get_user_session
 
-from .utils import get_tasks
+from .utils import LIST_COLUMNS, LIST_FIELDS, TASK_FIELDS, get_tasks, parse_fields
 
 todolist_router = APIRouter()
 
@@ -15,7 +18,7 @@ todolist_router = APIRouter()
 async def create_list(
     todolist: schemas.ListCreate,
     token: str = Depends(oauth2_scheme),
-    session: AsyncSession = Depends(get_session),
+    session: AsyncSession = Depends(get_user_session),
 ):
     """
     Function to create todolist.
@@ -31,11 +34,16 @@ async def create_list(
 
     todolist_data = {
         "name": todolist.name,
-        "user_id": user._data[0]
+        "user_id": user.id,
+        "task_count": 0,
+        "done_count": 0
     }
 
     query_todolist_create = models.todolist.insert().values(**todolist_data)
     result: AsyncResult = await session.execute(query_todolist_create)
+    last_record_id: int = result.inserted_primary_key[0] # creates new record and returns its id.
+    await record_changes(session, user.id, lists=[last_record_id])
+    invalidate_on_commit(session, user_lists_tag(user.id))
     await session_commit(
         Exception,
         HTTPException(
@@ -45,36 +53,77 @@ async def create_list(
         ),
         session
     )
-    last_record_id: int = result.inserted_primary_key[0] # creates new record and returns its id.
     resp = schemas.List(**todolist_data, id=last_record_id, tasks=[])
     return resp
 
-@todolist_router.get("", response_model=list[schemas.List], status_code=status.HTTP_200_OK)
+@todolist_router.get("", response_model=list[schemas.ListFields], response_model_exclude_unset=True, status_code=status.HTTP_200_OK)
 async def get_lists(
+    fields: str | None = None,
+    task_fields: str | None = None,
     token: str = Depends(oauth2_scheme),
-    session: AsyncSession = Depends(get_session)
+    session: AsyncSession = Depends(get_user_session)
 ):
     """
     Function to get all lists of current authenticated user.
     Args:
+        fields: comma-separated fields of lists to return, all by default. Tasks aren't queried without tasks field.
+        task_fields: comma-separated fields of tasks to return, all by default.
         token: token of currently logged in user.
         session: instance of current session with database.
     Returns:
         List of JSONa with full todolist data (id, name, user_id, task's list)
     """
+    list_fields = parse_fields(fields, LIST_FIELDS)
+    tasks_fields = parse_fields(task_fields, TASK_FIELDS)
     user = await is_user_activated(token=token, session=Session(session=session))
 
-    query_get_lists = models.todolist.select().where(models.todolist.c.user_id == user.id)
-    result: AsyncResult = await session.execute(query_get_lists)
-    lists = result.all()
-    resp = [schemas.List(**item._asdict(), tasks=await get_tasks(item._asdict()["id"], session)) for item in lists]
+    async def load_lists() -> list[dict]:
+        # id is always selected because tasks are grouped by it.
+        query_get_lists = queries.lists_by_user(tuple(field for field in LIST_COLUMNS if field in list_fields or field == "id"))
+        result: AsyncResult = await session.execute(query_get_lists, {"user_id": user.id})
+        lists = [item._asdict() for item in result.all()]
+
+        if "tasks" in list_fields:
+            tasks = await get_tasks([item["id"] for item in lists], user.id, session, tasks_fields)
+            for item in lists:
+                item["tasks"] = tasks[item["id"]]
+        return lists
+
+    lists = await cached(
+        session,
+        f"lists:{user.id}:{','.join(sorted(list_fields))}:{','.join(sorted(tasks_fields))}",
+        [user_lists_tag(user.id)],
+        load_lists
+    )
+    resp = [schemas.ListFields(**{field: value for field, value in item.items() if field in list_fields}) for item in lists]
     return resp
 
-@todolist_router.get("/{list_id}", response_model=schemas.List, status_code=status.HTTP_200_OK)
+@todolist_router.get("/summary", response_model=list[schemas.ListSummary], status_code=status.HTTP_200_OK)
+async def get_lists_summary(
+    token: str = Depends(oauth2_scheme),
+    session: AsyncSession = Depends(get_user_session)
+):
+    """
+    Function to get amounts of tasks in all lists of current authenticated user without fetching tasks themselves.
+    Args:
+        token: token of currently logged in user.
+        session: instance of current session with database.
+    Returns:
+        List of JSONs with id, name and counters of every list.
+    """
+    user = await is_user_activated(token=token, session=Session(session=session))
+
+    result: AsyncResult = await session.execute(queries.lists_summary, {"user_id": user.id})
+    resp = [schemas.ListSummary(**item._asdict()) for item in result.all()]
+    return resp
+
+@todolist_router.get("/{list_id}", response_model=schemas.ListFields, response_model_exclude_unset=True, status_code=status.HTTP_200_OK)
 async def retrieve_list(
     list_id: int,
     token: str = Depends(oauth2_scheme),
-    session: AsyncSession = Depends(get_session)
+    session: AsyncSession = Depends(get_user_session),
+    fields: str | None = None,
+    task_fields: str | None = None
 ):
     """
     Function to retrieve a list with specific id.
@@ -82,30 +131,52 @@ async def retrieve_list(
         list_id: id of a searched list.
         token: token of currently logged in user.
         session: instance of current session with database.
+        fields: comma-separated fields of a list to return, all by default. Tasks aren't queried without tasks field.
+        task_fields: comma-separated fields of tasks to return, all by default.
     Returns:
         JSON with full todolist data (id, name, user_id, task's list)
     """
+    list_fields = parse_fields(fields, LIST_FIELDS)
+    tasks_fields = parse_fields(task_fields, TASK_FIELDS)
     user = await is_user_activated(token=token, session=Session(session=session))
 
-    query_retrieve = models.todolist.select().where(models.todolist.c.id == list_id)
-    result_list: AsyncResult = await session.execute(query_retrieve)
-    list_item = result_list.one()
+    async def load_list() -> dict:
+        # user_id is always selected to check an owner.
+        query_retrieve = queries.list_by_id(tuple(field for field in LIST_COLUMNS if field in list_fields or field == "user_id"))
+        result_list: AsyncResult = await session.execute(query_retrieve, {"list_id": list_id})
+        list_item = result_list.one_or_none()
+        if list_item is None: # lists of users in other shards aren't found either.
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="List not found."
+            )
+        list_item = list_item._asdict()
 
-    tasks_data = await get_tasks(list_id=list_id, session=session)
+        if "tasks" in list_fields:
+            tasks = await get_tasks([list_id], list_item["user_id"], session, tasks_fields)
+            list_item["tasks"] = tasks[list_id]
+        return list_item
 
-    resp = schemas.List(**list_item._asdict(), tasks=tasks_data)
-    if user.id != resp.user_id: # check whether user is an owner of the list.
+    list_item = await cached(
+        session,
+        f"list:{list_id}:{','.join(sorted(list_fields))}:{','.join(sorted(tasks_fields))}",
+        [f"list:{list_id}"],
+        load_list
+    )
+    if user.id != list_item["user_id"]: # check whether user is an owner of the list.
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="This list belongs to other user."
         )
+
+    resp = schemas.ListFields(**{field: value for field, value in list_item.items() if field in list_fields})
     return resp
 
 @todolist_router.delete("/{list_id}/delete", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_list(
     list_id: int,
     token: str = Depends(oauth2_scheme),
-    session: AsyncSession = Depends(get_session)
+    session: AsyncSession = Depends(get_user_session)
 ):
     """
     Function to delete a list with specific id.
@@ -115,10 +186,12 @@ async def delete_list(
         session: instance of current session with database.
     """
     # retrieve a list which needs to be deleted with verification whether a list belongs to currently authenticated user.
-    list_item = await retrieve_list(list_id, token, session)
+    list_item = await retrieve_list(list_id, token, session, fields="id,user_id")
 
     query_delete = models.todolist.delete().where(models.todolist.c.id == list_item.id)
     await session.execute(query_delete)
+    await record_changes(session, list_item.user_id, deleted_lists=[list_item.id])
+    invalidate_on_commit(session, *list_tags(list_item.id, list_item.user_id))
     await session_commit(
         Exception,
         HTTPException(
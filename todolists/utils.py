@@ -1,12 +1,143 @@
+import logging
+import os
+
+from fastapi import HTTPException, status
+import sqlalchemy
 from sqlalchemy.ext.asyncio import AsyncSession, AsyncResult
 
-from db import models, schemas
+from cache.utils import invalidate, list_tags
+from db import models, queries
+from db.database import data_shards, shard_session
+from sync.utils import record_changes
+
+logger = logging.getLogger(__name__)
+
+COUNTERS_RECONCILE_BATCH_SIZE = int(os.environ.get("COUNTERS_RECONCILE_BATCH_SIZE", 1000))
+
+# fields which can be requested with fields and task_fields query parameters.
+LIST_COLUMNS = ("id", "name", "user_id", "task_count", "done_count")
+LIST_FIELDS = LIST_COLUMNS + ("tasks",)
+TASK_FIELDS = ("id", "task", "time", "description", "done")
 
 async def get_tasks(
-    list_id: int,
-    session: AsyncSession
-) -> list[schemas.Task]:
-    query_tasks_ids = models.task.select().join(models.task_list, models.task.c.id == models.task_list.c.task_id).where(models.task_list.c.list_id == list_id)
-    result_tasks: AsyncResult = await session.execute(query_tasks_ids)
-    tasks = result_tasks.all()
-    return [schemas.Task(**item._asdict()) for item in tasks]
+    list_ids: list[int],
+    user_id: int,
+    session: AsyncSession,
+    fields: set[str] | None = None
+) -> dict[int, list[dict]]:
+    """
+    Function to get tasks of several lists with one query.
+    Args:
+        list_ids: ids of lists.
+        user_id: id of an owner of lists.
+        session: instance of current session with database.
+        fields: names of task columns which will be selected, all by default.
+    Returns:
+        Dictionary with ids of lists as keys and lists of tasks data ordered by position as values.
+    """
+    query_tasks = queries.tasks_of_lists(tuple(field for field in TASK_FIELDS if fields is None or field in fields))
+    result_tasks: AsyncResult = await session.execute(query_tasks, {"list_ids": list_ids, "user_id": user_id})
+
+    tasks = {list_id: [] for list_id in list_ids}
+    for item in result_tasks.all():
+        task_data = item._asdict()
+        tasks[task_data.pop("list_id")].append(task_data)
+    return tasks
+
+def parse_fields(fields: str | None, allowed: tuple[str, ...]) -> set[str]:
+    """
+    Function to parse comma-separated names of fields from a query parameter.
+    Args:
+        fields: query parameter value. None means all fields.
+        allowed: names of fields which can be requested.
+    Returns:
+        Set of requested names.
+    """
+    if fields is None:
+        return set(allowed)
+
+    requested = {field.strip() for field in fields.split(",") if field.strip()}
+    unknown = requested.difference(allowed)
+    if unknown:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Unknown fields: {', '.join(sorted(unknown))}."
+        )
+    return requested
+
+async def get_task_list_id(task_id: int, session: AsyncSession) -> int | None:
+    """
+    Function to get id of a list which contains a task.
+    Args:
+        task_id: id of a task.
+        session: instance of current session with database.
+    Returns:
+        Id of a list or None if task doesn't belong to any list.
+    """
+    result: AsyncResult = await session.execute(queries.list_id_by_task, {"task_id": task_id})
+    return result.scalar()
+
+async def update_counters(list_id: int, session: AsyncSession, task_count: int = 0, done_count: int = 0) -> None:
+    """
+    Function to change counters of a list. Doesn't commit, so counters are changed in the same transaction as tasks.
+    Args:
+        list_id: id of a list.
+        session: instance of current session with database.
+        task_count: difference of total amount of tasks.
+        done_count: difference of amount of completed tasks.
+    """
+    await session.execute(
+        queries.update_counters,
+        {"list_id": list_id, "task_delta": task_count, "done_delta": done_count}
+    )
+
+async def reconcile_counters() -> None:
+    """
+    Function to repair counters of lists which differ from actual amounts of tasks. Used as a periodic job.
+    Lists are processed in batches by id, each batch in its own transaction to keep locks short.
+    """
+    task_count = sqlalchemy.select(sqlalchemy.func.count()).where(
+        models.task_list.c.list_id == models.todolist.c.id
+    ).scalar_subquery()
+    done_count = sqlalchemy.select(sqlalchemy.func.count()).select_from(
+        models.task_list.join(models.task, models.task.c.id == models.task_list.c.task_id)
+    ).where(
+        models.task_list.c.list_id == models.todolist.c.id,
+        models.task.c.done.is_(sqlalchemy.true())
+    ).scalar_subquery()
+
+    repaired = 0
+    for shard in data_shards():
+        last_id = 0
+        async with shard_session(shard) as session:
+            while True:
+                query_ids = sqlalchemy.select(models.todolist.c.id).where(
+                    models.todolist.c.id > last_id
+                ).order_by(models.todolist.c.id).limit(COUNTERS_RECONCILE_BATCH_SIZE)
+                result_ids: AsyncResult = await session.execute(query_ids)
+                ids = result_ids.scalars().all()
+                if not ids:
+                    break
+
+                last_id = ids[-1]
+                query_drifted = sqlalchemy.select(models.todolist.c.id, models.todolist.c.user_id).where(
+                    models.todolist.c.id.between(ids[0], ids[-1]),
+                    (models.todolist.c.task_count != task_count) | (models.todolist.c.done_count != done_count)
+                )
+                result_drifted: AsyncResult = await session.execute(query_drifted)
+                drifted = result_drifted.all()
+                if not drifted:
+                    continue
+
+                query_repair = models.todolist.update().where(
+                    models.todolist.c.id.in_([item.id for item in drifted])
+                ).values(task_count=task_count, done_count=done_count)
+                await session.execute(query_repair)
+                for user_id in sorted({item.user_id for item in drifted}):
+                    await record_changes(session, user_id, lists=[item.id for item in drifted if item.user_id == user_id])
+                await session.commit()
+                repaired += len(drifted)
+                await invalidate(*{tag for item in drifted for tag in list_tags(item.id, item.user_id)})
+
+    if repaired:
+        logger.warning("Counters of %d lists were repaired.", repaired)
@@ -1,4 +1,4 @@
-from datetime import timedelta
+from datetime import datetime, timedelta
 import os
 
 import bcrypt
@@ -7,8 +7,10 @@ from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
 from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession, AsyncResult
 
+from cache.utils import invalidate, invalidate_on_commit, principal_tag, user_lists_tag
 from db import schemas, models
-from db.database import get_session, session_commit
+from db.database import get_session, session_commit, shard_session
+from db.sharding import delete_user_data, get_user_shard
 
 from .models import Token, TokenData, NewPassword, Session, Success
 from .utils.auth import create_access_token, user_authenticate
@@ -37,13 +39,15 @@ async def create_user(backgroundtasks: BackgroundTasks, user: schemas.UserCreate
         "lastname": user.lastname,
         "email": user.email,
         "hashed_password": hashed_password.decode(),
-        "disabled": True
+        "disabled": True,
+        "created_at": datetime.utcnow()
     }
 
     query_user_create = models.users.insert().values(**user_data)
     result: AsyncResult = await session.execute(query_user_create)
-    await session_commit(IntegrityError, HTTPException(status_code=400, detail="User with this email already exists."), session)  
     last_record_id: int = result.inserted_primary_key[0] # creates new record and returns its id.
+    await session.execute(models.sync_revision.insert().values(user_id=last_record_id, revision=0))
+    await session_commit(IntegrityError, HTTPException(status_code=400, detail="User with this email already exists."), session)  
     resp = schemas.User(**user_data, id=last_record_id)
     await send_mail(resp.email, "verify", "Account Verification", backgroundtasks)
     return resp
@@ -73,7 +77,7 @@ async def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends(
     
     return resp
 
-@user_router.get("/me", response_model=schemas.User, status_code=status.HTTP_200_OK)
+@user_router.get("/me", response_model=schemas.Principal, status_code=status.HTTP_200_OK)
 async def retrieve_current_user(
         token: str = Depends(oauth2_scheme),
         session: AsyncSession = Depends(get_session)
@@ -84,7 +88,7 @@ async def retrieve_current_user(
         token: access token of current user.
         session: instance of AsyncSession object.
     Returns:
-        retrieved User pydantic model.
+        retrieved Principal pydantic model.
     """
     current_user = await is_user_activated(token, Session(session=session))
     return current_user
@@ -102,7 +106,15 @@ async def email_verification(token: str, session: AsyncSession = Depends(get_ses
     user = await get_current_user(Session(session=session), token)
     if user and user.disabled:
         query_update = models.users.update().where(models.users.c.id == user.id).values(disabled=False)
-        await session.execute(query_update)
+        result_update: AsyncResult = await session.execute(query_update)
+        if not result_update.rowcount: # user was purged after the token had been sent, its principal was cached.
+            await invalidate(principal_tag(user.email))
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Invalid or expired token.",
+                headers={"WWW-Authenticate": "Bearer"}
+            )
+        invalidate_on_commit(session, principal_tag(user.email))
         await session_commit(
             Exception,
             HTTPException(
@@ -132,8 +144,27 @@ async def delete_user(
         session: instance of AsyncSession object.
     """
     current_user = await is_user_activated(token=token, session=Session(session=session))
+    shard = await get_user_shard(current_user.id, session)
+    if shard is not None:
+        # data is deleted from the shard first, so a failure leaves the user able to try again.
+        async with shard_session(shard) as user_session:
+            await delete_user_data(current_user.id, user_session)
+            await user_session.execute(models.users.delete().where(models.users.c.id == current_user.id))
+            await session_commit(
+                Exception,
+                HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail="Something went wrong.",
+                    headers={"WWW-Authenticate": "Bearer"}
+                ),
+                user_session
+            )
+        await session.execute(models.shard_map.delete().where(models.shard_map.c.user_id == current_user.id))
+    else:
+        await delete_user_data(current_user.id, session)
     query_delete_user = models.users.delete().where(models.users.c.id == current_user.id)
     await session.execute(query_delete_user)
+    invalidate_on_commit(session, principal_tag(current_user.email), user_lists_tag(current_user.id))
     await session_commit(
         Exception,
         HTTPException(
@@ -171,6 +202,7 @@ async def reset_password(new_password: NewPassword, session: AsyncSession = Depe
 
     query = models.users.update().where(models.users.c.id == user.id).values(hashed_password=hashed_password.decode())
     await session.execute(query)
+    invalidate_on_commit(session, principal_tag(user.email))
     await session_commit(
         Exception,
         HTTPException(
@@ -7,7 +7,7 @@ from fastapi.security import OAuth2PasswordRequestForm
 from jose import jwt
 from sqlalchemy.ext.asyncio import AsyncResult
 
-from db import models, schemas
+from db import queries, schemas
 from ..models import Session
 
 async def user_authenticate(
@@ -21,8 +21,7 @@ async def user_authenticate(
     Returns:
         Pydantic model of User
     """
-    query_user_model = models.users.select(models.users.c.email == form_data.username)
-    result: AsyncResult = await session.session.execute(query_user_model)
+    result: AsyncResult = await session.session.execute(queries.user_by_email, {"email": form_data.username})
     user_model = result.one()
     if not user_model:
         raise HTTPException(status_code=400, detail=f"No user with {form_data.username} found")
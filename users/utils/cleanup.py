@@ -0,0 +1,79 @@
+import asyncio
+import datetime as dt
+import logging
+import os
+
+import sqlalchemy
+from sqlalchemy.ext.asyncio import AsyncResult
+
+from cache.utils import invalidate, list_tags, principal_tag, user_lists_tag
+from db import models
+from db.database import async_session
+
+logger = logging.getLogger(__name__)
+
+USER_PURGE_AGE_DAYS = int(os.environ.get("USER_PURGE_AGE_DAYS", 7))
+USER_PURGE_BATCH_SIZE = int(os.environ.get("USER_PURGE_BATCH_SIZE", 100))
+USER_PURGE_BATCH_DELAY = float(os.environ.get("USER_PURGE_BATCH_DELAY", 1))
+
+async def purge_unverified_users() -> None:
+    """
+    Function to delete users who haven't verified their email for USER_PURGE_AGE_DAYS together with
+    their lists and tasks. Used as a periodic job.
+    Users are deleted in small batches with a pause between them, so the job doesn't hold locks for long.
+    """
+    cutoff = dt.datetime.utcnow() - dt.timedelta(days=USER_PURGE_AGE_DAYS)
+    # disabled condition is the same as in ix_users_unverified_created_at, so the partial index can be used.
+    query_select = sqlalchemy.select(models.users.c.id, models.users.c.email).where(
+        models.users.c.disabled.is_(sqlalchemy.true()),
+        models.users.c.created_at < cutoff
+    ).order_by(models.users.c.created_at).limit(USER_PURGE_BATCH_SIZE).with_for_update(
+        skip_locked=True # users who are being verified right now are checked again next time.
+    )
+
+    purged = {"users": 0, "lists": 0, "tasks": 0}
+    async with async_session() as session:
+        while True:
+            result: AsyncResult = await session.execute(query_select)
+            users = result.all()
+            if not users:
+                break
+
+            user_ids = [item.id for item in users]
+            query_lists = sqlalchemy.select(models.todolist.c.id, models.todolist.c.user_id).where(
+                models.todolist.c.user_id.in_(user_ids)
+            )
+            result_lists: AsyncResult = await session.execute(query_lists)
+            lists = result_lists.all()
+
+            # rows referring to users are deleted first because of foreign keys.
+            await session.execute(models.task_list.delete().where(
+                models.task_list.c.list_id.in_([item.id for item in lists])
+            ))
+            result_tasks: AsyncResult = await session.execute(
+                models.task.delete().where(models.task.c.user_id.in_(user_ids))
+            )
+            await session.execute(models.task_archive.delete().where(models.task_archive.c.user_id.in_(user_ids)))
+            await session.execute(models.todolist.delete().where(models.todolist.c.user_id.in_(user_ids)))
+            await session.execute(models.change_log.delete().where(models.change_log.c.user_id.in_(user_ids)))
+            await session.execute(models.sync_revision.delete().where(models.sync_revision.c.user_id.in_(user_ids)))
+            await session.execute(models.users.delete().where(models.users.c.id.in_(user_ids)))
+            await session.commit()
+            await invalidate(
+                *[principal_tag(item.email) for item in users],
+                *[user_lists_tag(user_id) for user_id in user_ids],
+                *{tag for item in lists for tag in list_tags(item.id, item.user_id)}
+            )
+
+            purged["users"] += len(users)
+            purged["lists"] += len(lists)
+            purged["tasks"] += result_tasks.rowcount
+            if len(users) < USER_PURGE_BATCH_SIZE:
+                break
+            await asyncio.sleep(USER_PURGE_BATCH_DELAY)
+
+    if purged["users"]:
+        logger.info(
+            "%d unverified users were purged with %d lists and %d tasks.",
+            purged["users"], purged["lists"], purged["tasks"]
+        )
@@ -1,13 +1,13 @@
 import os
 
-from databases.interfaces import Record
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from jose import jwt, JWTError
 from pydantic import EmailStr
-from sqlalchemy.ext.asyncio import AsyncResult
+from sqlalchemy.ext.asyncio import AsyncResult, AsyncSession
 
-from db import models, schemas
+from cache.utils import cached, principal_tag
+from db import queries, schemas
 
 from ..models import Session
 
@@ -17,14 +17,14 @@ credentials_exception = HTTPException(
         headers={"WWW-Authenticate": "Bearer"},
     )
 
-async def get_current_user(session: Session, token: str = Depends(OAuth2PasswordBearer(tokenUrl="api/v1/users/token"))) -> Record:
+async def get_current_user(session: Session, token: str = Depends(OAuth2PasswordBearer(tokenUrl="api/v1/users/token"))) -> schemas.Principal:
     """
     Function to get current user by its access token.
     Args:
         token: access token of current user.
         session: Pydantic model of AsyncSession object.
     Returns:
-        Instance of SQLAlchemy Record class with user info.
+        Pydantic model of Principal.
     """
     try:
         payload = jwt.decode(token, os.environ.get("SECRET_KEY"), algorithms=[os.environ.get("ALGORITHM")])
@@ -35,15 +35,34 @@ async def get_current_user(session: Session, token: str = Depends(OAuth2Password
     except JWTError:
         raise credentials_exception
 
-    query_user = models.users.select(models.users.c.email == email)
-    result: AsyncResult = await session.session.execute(query_user) # getting user from db
-    user = result.one()
-    if not user:
+    # user is remembered for the whole session, so several calls in one request (e.g. batch) query it once.
+    principal_key = ("principal", email)
+    if principal_key in session.session.info:
+        return session.session.info[principal_key]
+
+    async def load_user() -> dict | None:
+        result: AsyncResult = await session.session.execute(queries.principal_by_email, {"email": email}) # getting user from db
+        user = result.one_or_none()
+        return user._asdict() if user else None
+
+    user_data = await cached(session.session, principal_tag(email), [principal_tag(email)], load_user)
+    if not user_data:
         raise credentials_exception
     
+    user = schemas.Principal(**user_data)
+    remember_user(session.session, user)
     return user
 
-async def is_user_activated(token: str, session: Session) -> schemas.User:
+def remember_user(session: AsyncSession, user: schemas.Principal) -> None:
+    """
+    Function to remember authenticated user in a session, so get_current_user doesn't query it with this session.
+    Args:
+        session: instance of AsyncSession.
+        user: Pydantic model of Principal.
+    """
+    session.info[("principal", user.email)] = user
+
+async def is_user_activated(token: str, session: Session) -> schemas.Principal:
     """
     Function to check whether user is activated or not.
     Args:
@@ -52,7 +71,7 @@ async def is_user_activated(token: str, session: Session) -> schemas.User:
     Returns:
         The same model if user is activated.
     """
-    current_user: schemas.User = await get_current_user(session, token)
+    current_user: schemas.Principal = await get_current_user(session, token)
     if current_user.disabled:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -0,0 +1,36 @@
+from typing import AsyncIterable
+
+from fastapi import Depends
+from fastapi.security import OAuth2PasswordBearer
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from db.database import get_session, shard_session
+from db.sharding import get_user_shard, mirror_user
+
+from ..models import Session
+from .get_current_user import is_user_activated, remember_user
+
+async def get_user_session(
+    token: str = Depends(OAuth2PasswordBearer(tokenUrl="api/v1/users/token")),
+    session: AsyncSession = Depends(get_session)
+) -> AsyncIterable[AsyncSession]:
+    """
+    Function to get session with a database which keeps lists and tasks of current authenticated user.
+    Without DB_SHARD_URLS it's the session with the main database.
+    Args:
+        token: access token of current user.
+        session: instance of session with the main database.
+    Returns:
+        Instance of AsyncSession.
+    """
+    user = await is_user_activated(token=token, session=Session(session=session))
+    shard = await get_user_shard(user.id, session)
+    if shard is None:
+        yield session
+        return
+
+    async with shard_session(shard) as user_session:
+        await mirror_user(user.id, user_session)
+        # user is authenticated already, so endpoints don't look for it in a shard.
+        remember_user(user_session, user)
+        yield user_session
@@ -1,20 +1,39 @@
 import os
+from typing import TYPE_CHECKING
 
 from fastapi import BackgroundTasks
-from fastapi_mail import ConnectionConfig, FastMail, MessageSchema
 from pydantic import EmailStr
 
 from .auth import create_access_token
 
-conf = ConnectionConfig(
-    MAIL_USERNAME=os.environ.get("EMAIL_HOST"),
-    MAIL_PASSWORD=os.environ.get("EMAIL_PASSWORD"),
-    MAIL_FROM=os.environ.get("EMAIL_HOST"),
-    MAIL_PORT=587,
-    MAIL_SERVER="smtp.gmail.com",
-    MAIL_SSL_TLS=False,
-    MAIL_STARTTLS=True
-)
+if TYPE_CHECKING:
+    from fastapi_mail import FastMail
+
+_mail_client: "FastMail | None" = None
+
+def get_mail_client() -> "FastMail":
+    """
+    Function to get mail client, it's created when the first mail is sent.
+    fastapi_mail is imported here as well because it takes a noticeable part of import time of the app
+    and its config fails without mail settings.
+    Returns:
+        Instance of FastMail shared by the whole process.
+    """
+    global _mail_client
+    if _mail_client is None:
+        from fastapi_mail import ConnectionConfig, FastMail
+
+        conf = ConnectionConfig(
+            MAIL_USERNAME=os.environ.get("EMAIL_HOST"),
+            MAIL_PASSWORD=os.environ.get("EMAIL_PASSWORD"),
+            MAIL_FROM=os.environ.get("EMAIL_HOST"),
+            MAIL_PORT=587,
+            MAIL_SERVER="smtp.gmail.com",
+            MAIL_SSL_TLS=False,
+            MAIL_STARTTLS=True
+        )
+        _mail_client = FastMail(conf)
+    return _mail_client
 
 async def send_mail(
         email: EmailStr,
@@ -34,6 +53,8 @@ async def send_mail(
     with open(f"users/email_templates/{email_template}.html", "r") as file:
         template = file.read().format(token=token)
 
+    from fastapi_mail import MessageSchema
+
     message = MessageSchema(
         subject=subject,
         recipients=[email],
@@ -41,5 +62,4 @@ async def send_mail(
         subtype="html"
     )
 
-    fm = FastMail(conf)
-    backgroundtasks.add_task(fm.send_message, message)
+    backgroundtasks.add_task(get_mail_client().send_message, message)